@@ -1,10 +1,19 @@
 import discord
 from discord.ext import commands, tasks
 import json
-from datetime import datetime, timedelta
-from config import settings
+from datetime import datetime
+from config import settings, store as config_store
 import os
+import asyncio
+import heapq
 import pytz
+from utils.sessions import SessionTracker
+from utils.activity_store import make_backend
+from utils.backup import backups
+from utils.persistence import persistence, write_text_atomic
+from utils.leaderboard import RankedIndex
+from utils.log_sink import log_sink
+from utils.snapshots import EXTENSION, iter_snapshot, list_snapshots, write_snapshot
 
 GAME_KEYWORDS = ["game"]
 
@@ -23,18 +32,56 @@ class ActivityTracker(commands.Cog):
 
         self.activity_times = {}
         self.voice_times = {}
-        self.blacklist = set(a.lower() for a in settings.get("activity_blacklist", []))
+        self.blacklist = set(config_store.current.blacklist)
 
         self.leaderboard_channel_id = settings["ACTIVITY_CHANNEL_ID"]
-        self.log_channel_id = settings.get("LOG_CHANNEL_ID")
 
-        self.load_data()
-        self.update_ongoing.start()
+        self.store = make_backend(
+            settings.get("ACTIVITY_STORAGE", "sqlite"),
+            self.data_file,
+            compact_every=settings.get("ACTIVITY_COMPACT_EVERY", 5000),
+            compact_interval=settings.get("ACTIVITY_COMPACT_INTERVAL", 3600),
+        )
+
+    async def cog_load(self):
+        # the stored totals are read on a worker thread, not in __init__ on the event loop
+        await self.load_data()
+        self.sessions = SessionTracker(self.activity_times, self.voice_times, self.blacklist)
+        self.sessions.listeners.append(self.store.record)
+        self.sessions.listeners.append(self._update_ranks)
+
+        self.baseline = None  # running sum of all weekly backups, loaded lazily
+        self._weekly_ranks_count = None
+        self._rebuild_ranks()
         self.auto_save.start()
         self.leaderboard_task.start()
 
         self.bot.loop.create_task(self._init_voice_sessions())
         self.bot.loop.create_task(self._init_activities())
+        self.bot.lifecycle.on_reconnect("activity_tracker", self._resync)
+        config_store.subscribe("activity_tracker", self._apply_config, keys=["activity_blacklist"])
+        # live totals including the sessions that are still open, the database only has settled time
+        backups.register("activity_live.json", lambda: json.dumps(
+            {"activity_times": self.activity_times, "voice_times": self.voice_times}
+        ))
+
+    async def cog_unload(self):
+        self.bot.lifecycle.remove("activity_tracker")
+        backups.unregister("activity_live.json")
+        config_store.unsubscribe("activity_tracker")
+        self.auto_save.cancel()
+        self.leaderboard_task.cancel()
+        self.sessions.settle(current_timestamp())
+        try:
+            # waits for the write, so a reload reads the final totals
+            await self.store.close(self.activity_times, self.voice_times)
+        except Exception as e:
+            print(f"Error saving data: {e}")
+
+    def _apply_config(self, snapshot):
+        # in place, the session tracker holds a reference to this set
+        self.blacklist.clear()
+        self.blacklist.update(snapshot.blacklist)
 
     # -------------------- Initialization --------------------
     async def _init_voice_sessions(self):
@@ -44,92 +91,119 @@ class ActivityTracker(commands.Cog):
             for vc in guild.voice_channels:
                 for member in vc.members:
                     if not member.bot:
-                        user_id = str(member.id)
-                        self.voice_times.setdefault(user_id, {"total": 0, "ongoing_start": now})
+                        self.sessions.open_voice_session(str(member.id), now)
 
     async def _init_activities(self):
         await self.bot.wait_until_ready()
         now = current_timestamp()
-        log_channel = self.bot.get_channel(self.log_channel_id) if self.log_channel_id else None
-
-        # Reset ongoing_start
-        for user_dict in (self.activity_times,):
-            for activities in user_dict.values():
-                for stats in activities.values():
-                    stats["ongoing_start"] = None
 
         recorded = []
         for guild in self.bot.guilds:
             for member in guild.members:
                 if member.bot:
                     continue
-                user_id = str(member.id)
-                self.activity_times.setdefault(user_id, {})
-
-                for activity in member.activities:
-                    if activity and activity.type != discord.ActivityType.custom:
-                        act_name = getattr(activity, "name", str(activity))
-                        self.activity_times[user_id].setdefault(act_name, {"main": 0, "duplicate": 0, "ongoing_start": now})
+                for act_name in self._activity_names(member):
+                    if self.sessions.open_activity(str(member.id), act_name, now):
                         recorded.append((member.display_name, act_name))
 
-        if log_channel:
-            if recorded:
-                msg = "\n".join([f"• {u} - {a}" for u, a in recorded])
-                await log_channel.send(
-                    f"🟢 **Startup Activity Tracking Initialized**\nDetected ongoing activities ({len(recorded)}):\n{msg}"
-                )
-            else:
-                await log_channel.send("🟢 Startup complete — no ongoing activities detected.")
+        if recorded:
+            log_sink.log(f"🟢 **Startup Activity Tracking Initialized**\nDetected ongoing activities ({len(recorded)}):")
+            for u, a in recorded:
+                log_sink.log(f"• {u} - {a}")
+        else:
+            log_sink.log("🟢 Startup complete — no ongoing activities detected.")
+
+    async def _resync(self):
+        """After a reconnect: fix sessions whose join/leave/presence events were missed."""
+        now = current_timestamp()
+        in_voice = {
+            str(member.id)
+            for guild in self.bot.guilds for vc in guild.voice_channels for member in vc.members
+            if not member.bot
+        }
+        voice_closed = set(self.sessions.open_voice) - in_voice
+        voice_opened = in_voice - set(self.sessions.open_voice)
+        for user_id in voice_closed:
+            self.sessions.close_voice_session(user_id, now)
+        for user_id in voice_opened:
+            self.sessions.open_voice_session(user_id, now)
+
+        playing = {}
+        for guild in self.bot.guilds:
+            for member in guild.members:
+                if not member.bot and member.activities:
+                    names = self._activity_names(member)
+                    if names:
+                        playing.setdefault(str(member.id), set()).update(names)
+        running = {}
+        for user_id, act_name in self.sessions.open_activities:
+            running.setdefault(user_id, set()).add(act_name)
+        changed = [u for u in running.keys() | playing.keys() if running.get(u, set()) != playing.get(u, set())]
+        for user_id in changed:
+            self.sessions.sync_activities(user_id, playing.get(user_id, set()), now)
+
+        if voice_opened or voice_closed or changed:
+            log_sink.log(f"🔄 Activity resync: voice +{len(voice_opened)}/-{len(voice_closed)}, activities changed for {len(changed)} user(s)")
 
     # -------------------- Load / Save --------------------
-    def load_data(self):
-        try:
-            with open(self.data_file) as f:
-                data = json.load(f)
-                self.activity_times = data.get("activity_times", {})
-                self.voice_times = data.get("voice_times", {})
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.activity_times, self.voice_times = {}, {}
+    async def load_data(self):
+        self.activity_times, self.voice_times = await self.store.load()
+
+        # Sessions from a previous run are stale, they get reopened from the live state
+        for activities in self.activity_times.values():
+            for stats in activities.values():
+                stats["ongoing_start"] = None
+        for stats in self.voice_times.values():
+            stats["ongoing_start"] = None
 
     def save_data(self):
         try:
-            with open(self.data_file, "w") as f:
-                json.dump({"activity_times": self.activity_times, "voice_times": self.voice_times}, f, indent=4)
+            self.store.save(self.activity_times, self.voice_times)
         except Exception as e:
             print(f"Error saving data: {e}")
 
-    # -------------------- Tasks --------------------
-    @tasks.loop(seconds=10)
-    async def update_ongoing(self):
-        await self.bot.wait_until_ready()
-        await self._update_active_users_once()
-
-    async def _update_active_users_once(self):
-        now = current_timestamp()
-        for user_id, activities in self.activity_times.items():
-            for act_name, stats in activities.items():
-                start = stats.get("ongoing_start")
-                if start:
-                    elapsed = now - start
-                    if act_name.lower() in self.blacklist:
-                        stats["duplicate"] += elapsed
-                    else:
-                        stats["main"] += elapsed
-                    stats["ongoing_start"] = now
-
-        for user_id, data in self.voice_times.items():
-            start = data.get("ongoing_start")
-            if start:
-                elapsed = now - start
-                data["total"] += elapsed
-                data["ongoing_start"] = now
+    # -------------------- Event Listeners --------------------
+    @staticmethod
+    def _activity_names(member):
+        return {
+            getattr(act, "name", str(act))
+            for act in member.activities
+            if act and act.type != discord.ActivityType.custom
+        }
+
+    @commands.Cog.listener()
+    async def on_presence_update(self, before, after):
+        if after.bot:
+            return
+        new_acts = self._activity_names(after)
+        if new_acts == self._activity_names(before):
+            return  # status-only change
+        self.sessions.sync_activities(str(after.id), new_acts, current_timestamp())
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        if member.bot:
+            return
+        user_id = str(member.id)
+        if before.channel is None and after.channel is not None:
+            self.sessions.open_voice_session(user_id, current_timestamp())
+        elif before.channel is not None and after.channel is None:
+            self.sessions.close_voice_session(user_id, current_timestamp())
 
+    # -------------------- Tasks --------------------
     @tasks.loop(seconds=60)
     async def auto_save(self):
         await self.bot.wait_until_ready()
+        self.sessions.settle(current_timestamp())
         self.save_data()
 
     # -------------------- Helper --------------------
+    def _copy_state(self):
+        """Copy of the totals that a worker thread can read while the loop keeps updating."""
+        activity_copy = {uid: {act: dict(v) for act, v in acts.items()} for uid, acts in self.activity_times.items()}
+        voice_copy = {uid: dict(v) for uid, v in self.voice_times.items()}
+        return activity_copy, voice_copy
+
     def _load_json(self, path):
         try:
             with open(path, "r") as f:
@@ -138,140 +212,254 @@ class ActivityTracker(commands.Cog):
             return None
 
     def _combine_backups(self):
-        backups = [f for f in os.listdir(self.backup_dir) if f.startswith("weekly_data_") and f.endswith(".json")]
+        backups = list_snapshots(self.backup_dir)
         if not backups:
             return {"activity_times": {}, "voice_times": {}}, 0
 
         combined = {"activity_times": {}, "voice_times": {}}
-        for file in backups:
-            data = self._load_json(os.path.join(self.backup_dir, file))
-            if not data:
-                continue
-            for uid, acts in data.get("activity_times", {}).items():
-                combined["activity_times"].setdefault(uid, {})
-                for act, val in acts.items():
-                    stats = combined["activity_times"][uid].setdefault(act, {"main": 0, "duplicate": 0})
-                    stats["main"] += val.get("main", 0)
-                    stats["duplicate"] += val.get("duplicate", 0)
-            for uid, v in data.get("voice_times", {}).items():
-                combined["voice_times"].setdefault(uid, {"total": 0})
-                combined["voice_times"][uid]["total"] += v.get("total", 0)
+        for path in backups:
+            try:
+                for uid, acts, voice_total in iter_snapshot(path):
+                    if acts:
+                        combined["activity_times"].setdefault(uid, {})
+                    for act, val in acts.items():
+                        stats = combined["activity_times"][uid].setdefault(act, {"main": 0, "duplicate": 0})
+                        stats["main"] += val["main"]
+                        stats["duplicate"] += val["duplicate"]
+                    if voice_total is not None:
+                        combined["voice_times"].setdefault(uid, {"total": 0})
+                        combined["voice_times"][uid]["total"] += voice_total
+            except Exception as e:
+                print(f"[weekly] Skipping unreadable backup {os.path.basename(path)}: {e}")
         return combined, len(backups)
 
-    def _load_or_recalculate_baseline(self):
-        baseline_data = self._load_json(self.baseline_file)
-        combined_count = 0
-        recalc_needed = True
-
-        if baseline_data:
-            stored_count = baseline_data.get("_backup_count", 0)
-            current_count = len([f for f in os.listdir(self.backup_dir) if f.startswith("weekly_data_")])
-            age_ok = datetime.utcnow() - datetime.utcfromtimestamp(os.path.getmtime(self.baseline_file)) < timedelta(days=7)
-            if stored_count == current_count and age_ok:
-                recalc_needed = False
+    def _count_backups(self):
+        return len(list_snapshots(self.backup_dir))
 
-        if not recalc_needed:
+    def _read_baseline(self):
+        """Stored baseline, or a rebuild when it doesn't match the backups; returns ``(baseline, rebuilt)``."""
+        baseline_data = self._load_json(self.baseline_file)
+        if baseline_data and baseline_data.get("_backup_count", 0) == self._count_backups():
             print("[weekly] Using existing baseline")
-            return baseline_data
+            return baseline_data, False
 
         print("[weekly] Rebuilding baseline from backups...")
         combined_data, combined_count = self._combine_backups()
         combined_data["_backup_count"] = combined_count
-        with open(self.baseline_file, "w") as f:
-            json.dump(combined_data, f, indent=4)
         print(f"[weekly] Baseline rebuilt from {combined_count} backups.")
-        return combined_data
+        return combined_data, True
+
+    async def _get_baseline(self):
+        """The baseline is kept in memory and only read (or rebuilt) once, on a worker thread."""
+        if self.baseline is None:
+            baseline, rebuilt = await persistence.run(self._read_baseline)
+            if self.baseline is None:  # another caller may have loaded it meanwhile
+                if rebuilt:
+                    self._set_baseline(baseline, baseline["_backup_count"])
+                else:
+                    self.baseline = baseline
+        return self.baseline
+
+    def _set_baseline(self, baseline, backup_count):
+        baseline["_backup_count"] = backup_count
+        self.baseline = baseline
+        self._weekly_ranks_count = None
+        persistence.mark_dirty(
+            self.baseline_file,
+            lambda: json.dumps(self.baseline, separators=(",", ":")),
+            lambda text: write_text_atomic(self.baseline_file, text),
+        )
+
+    def _add_to_baseline(self, activity_times, voice_times):
+        """Fold one new weekly backup into the loaded baseline, O(this week's data)."""
+        baseline = self.baseline
+        for uid, acts in activity_times.items():
+            user_acts = baseline.setdefault("activity_times", {}).setdefault(uid, {})
+            for act, val in acts.items():
+                stats = user_acts.setdefault(act, {"main": 0, "duplicate": 0})
+                stats["main"] += val.get("main", 0)
+                stats["duplicate"] += val.get("duplicate", 0)
+        for uid, v in voice_times.items():
+            baseline.setdefault("voice_times", {}).setdefault(uid, {"total": 0})["total"] += v.get("total", 0)
+        self._set_baseline(baseline, baseline.get("_backup_count", 0) + 1)
+
+    async def _write_week(self, path, activity_times, voice_times):
+        """Write one weekly snapshot and fold it into the baseline."""
+        # load (or rebuild) the baseline before the snapshot exists, a rebuild afterwards would already
+        # contain it and _add_to_baseline would count the week a second time
+        await self._get_baseline()
+        await persistence.run(write_snapshot, path, activity_times, voice_times)
+        self._add_to_baseline(activity_times, voice_times)
+
+    @staticmethod
+    def _count_baseline_differences(a, b):
+        differences = 0
+        a_acts, b_acts = a.get("activity_times", {}), b.get("activity_times", {})
+        for uid in a_acts.keys() | b_acts.keys():
+            a_user, b_user = a_acts.get(uid, {}), b_acts.get(uid, {})
+            for act in a_user.keys() | b_user.keys():
+                a_val = a_user.get(act, {"main": 0, "duplicate": 0})
+                b_val = b_user.get(act, {"main": 0, "duplicate": 0})
+                if (a_val["main"], a_val["duplicate"]) != (b_val["main"], b_val["duplicate"]):
+                    differences += 1
+        a_voice, b_voice = a.get("voice_times", {}), b.get("voice_times", {})
+        for uid in a_voice.keys() | b_voice.keys():
+            if a_voice.get(uid, {"total": 0})["total"] != b_voice.get(uid, {"total": 0})["total"]:
+                differences += 1
+        return differences
+
+    @staticmethod
+    def _weekly_user_difference(acts, prev_user):
+        weekly = {}
+        for act, data in acts.items():
+            prev = prev_user.get(act, {"main": 0, "duplicate": 0})
+            weekly[act] = {"main": max(0, data["main"] - prev["main"]),
+                           "duplicate": max(0, data["duplicate"] - prev["duplicate"])}
+        return weekly
 
     def _calculate_weekly_difference(self, current, baseline):
         weekly_activities = {}
         weekly_voice = {}
         for uid, acts in current.get("activity_times", {}).items():
-            weekly_activities[uid] = {}
             prev_user = baseline.get("activity_times", {}).get(uid, {})
-            for act, data in acts.items():
-                prev = prev_user.get(act, {"main": 0, "duplicate": 0})
-                weekly_activities[uid][act] = {"main": max(0, data["main"] - prev["main"]),
-                                              "duplicate": max(0, data["duplicate"] - prev["duplicate"])}
+            weekly_activities[uid] = self._weekly_user_difference(acts, prev_user)
         for uid, vdata in current.get("voice_times", {}).items():
             prev = baseline.get("voice_times", {}).get(uid, {"total": 0})
             weekly_voice[uid] = {"total": max(0, vdata["total"] - prev["total"])}
         return weekly_activities, weekly_voice
 
+    # -------------------- Leaderboard Index --------------------
+    def _rebuild_ranks(self):
+        """Full rebuild, only needed on load and after the weekly reset."""
+        self.activity_rank = RankedIndex(
+            {uid: sum(v["main"] for v in acts.values()) for uid, acts in self.activity_times.items()}
+        )
+        self.voice_rank = RankedIndex({uid: v["total"] for uid, v in self.voice_times.items()})
+        self._weekly_ranks_count = None  # weekly ranks are rebuilt lazily on the next request
+
+    def _rebuild_weekly_ranks(self, baseline):
+        weekly_activities, weekly_voice = self._calculate_weekly_difference(
+            {"activity_times": self.activity_times, "voice_times": self.voice_times}, baseline
+        )
+        self.weekly_activity_rank = RankedIndex(
+            {uid: sum(v["main"] for v in acts.values()) for uid, acts in weekly_activities.items()}
+        )
+        self.weekly_voice_rank = RankedIndex({uid: v["total"] for uid, v in weekly_voice.items()})
+        self._weekly_ranks_count = baseline["_backup_count"]
+
+    async def _weekly_ranks(self):
+        baseline = await self._get_baseline()
+        if self._weekly_ranks_count != baseline["_backup_count"]:
+            self._rebuild_weekly_ranks(baseline)
+        return self.weekly_activity_rank, self.weekly_voice_rank
+
+    def _update_ranks(self, user_id, act_name, field, elapsed):
+        """SessionTracker listener: move the user in every index by the settled time."""
+        baseline = self.baseline if self._weekly_ranks_count is not None else None
+        if act_name is None:
+            total = self.voice_times[user_id]["total"]
+            self.voice_rank.set(user_id, total)
+            if baseline is not None:
+                prev = baseline.get("voice_times", {}).get(user_id, {}).get("total", 0)
+                self.weekly_voice_rank.set(user_id, max(0, total - prev))
+            return
+        if field != "main":
+            return
+        self.activity_rank.add(user_id, elapsed)
+        if baseline is not None:
+            current = self.activity_times[user_id][act_name]["main"]
+            prev = baseline.get("activity_times", {}).get(user_id, {}).get(act_name, {}).get("main", 0)
+            self.weekly_activity_rank.add(user_id, max(0, current - prev) - max(0, current - elapsed - prev))
+
     # -------------------- Leaderboard Embeds --------------------
-    async def _generate_alltime_leaderboard_embeds(self, activity_data, voice_data):
-        limit = settings.get("leaderboard_limit", 10)
+    @staticmethod
+    def _top_activities(acts, count=3):
+        return heapq.nlargest(count, acts.items(), key=lambda x: x[1]["main"])
+
+    async def _generate_alltime_leaderboard_embeds(self, top_activity, top_voice):
         embed_a = discord.Embed(title="📊 All-Time Activity Leaderboard", color=discord.Color.orange())
-        sorted_users = sorted(activity_data.items(), key=lambda x: sum(v["main"] for v in x[1].values()), reverse=True)[:limit]
 
-        for rank, (uid, acts) in enumerate(sorted_users, start=1):
+        for rank, (uid, total_main) in enumerate(top_activity, start=1):
             user = self.bot.get_user(int(uid))
             name = user.display_name if user else uid
-            total_main = sum(v["main"] for v in acts.values())
-            top_acts = sorted(acts.items(), key=lambda x: x[1]["main"], reverse=True)[:3]
+            top_acts = self._top_activities(self.activity_times.get(uid, {}))
             act_text = "\n".join([f"{act}: {v['main']/3600:.2f} h (dupl.: {v['duplicate']/3600:.2f} h)" for act, v in top_acts])
             embed_a.add_field(name=f"#{rank} {name} - Total: {total_main/3600:.2f} h",
                               value=f"Top Activities:\n{act_text}", inline=False)
 
         embed_v = discord.Embed(title="🎙️ All-Time Voice Leaderboard", color=discord.Color.teal())
-        sorted_voice = sorted(voice_data.items(), key=lambda x: x[1]["total"], reverse=True)[:limit]
-        for rank, (uid, v) in enumerate(sorted_voice, start=1):
+        for rank, (uid, total) in enumerate(top_voice, start=1):
             user = self.bot.get_user(int(uid))
             name = user.display_name if user else uid
-            total = v["total"]
             embed_v.add_field(name=f"#{rank} {name} - Total: {total/3600:.2f} h", value="", inline=False)
 
         return embed_a, embed_v
 
-    async def _generate_weekly_leaderboard_embeds(self, activity_data, voice_data):
-        limit = settings.get("leaderboard_limit", 10)
+    async def _generate_weekly_leaderboard_embeds(self, top_activity, top_voice):
         embed_a = discord.Embed(title="📊 Weekly Activity Leaderboard", color=discord.Color.orange())
-        sorted_users = sorted(activity_data.items(), key=lambda x: sum(v["main"] for v in x[1].values()), reverse=True)[:limit]
+        prev_activities = self.baseline.get("activity_times", {})
 
-        for rank, (uid, acts) in enumerate(sorted_users, start=1):
+        for rank, (uid, total_main) in enumerate(top_activity, start=1):
             user = self.bot.get_user(int(uid))
             name = user.display_name if user else uid
-            total_main = sum(v["main"] for v in acts.values())
             daily_avg = total_main / 7 / 3600  # DAILY AVERAGE
-            top_acts = sorted(acts.items(), key=lambda x: x[1]["main"], reverse=True)[:3]
+            acts = self._weekly_user_difference(self.activity_times.get(uid, {}), prev_activities.get(uid, {}))
+            top_acts = self._top_activities(acts)
             act_text = "\n".join([f"{act}: {v['main']/3600:.2f} h (dupl.: {v['duplicate']/3600:.2f} h)" for act, v in top_acts])
             embed_a.add_field(name=f"#{rank} {name} - Total: {total_main/3600:.2f} h",
                               value=f"Daily Avg: {daily_avg:.2f} h\nTop Activities:\n{act_text}", inline=False)
 
         embed_v = discord.Embed(title="🎙️ Weekly Voice Leaderboard", color=discord.Color.teal())
-        sorted_voice = sorted(voice_data.items(), key=lambda x: x[1]["total"], reverse=True)[:limit]
-        for rank, (uid, v) in enumerate(sorted_voice, start=1):
+        for rank, (uid, total) in enumerate(top_voice, start=1):
             user = self.bot.get_user(int(uid))
             name = user.display_name if user else uid
-            total = v["total"]
             daily_avg = total / 7 / 3600
             embed_v.add_field(name=f"#{rank} {name} - Total: {total/3600:.2f} h",
                               value=f"Daily Avg: {daily_avg:.2f} h", inline=False)
 
         return embed_a, embed_v
 
-    async def generate_leaderboard(self, ctx_or_channel, activity_data, voice_data, alltime=True):
+    async def generate_leaderboard(self, ctx_or_channel, alltime=True):
+        limit = settings.get("leaderboard_limit", 10)
+        self.sessions.settle(current_timestamp())
         if alltime:
-            embed_a, embed_v = await self._generate_alltime_leaderboard_embeds(activity_data, voice_data)
+            embed_a, embed_v = await self._generate_alltime_leaderboard_embeds(
+                self.activity_rank.top(limit), self.voice_rank.top(limit)
+            )
         else:
-            embed_a, embed_v = await self._generate_weekly_leaderboard_embeds(activity_data, voice_data)
+            activity_rank, voice_rank = await self._weekly_ranks()
+            embed_a, embed_v = await self._generate_weekly_leaderboard_embeds(
+                activity_rank.top(limit), voice_rank.top(limit)
+            )
         await ctx_or_channel.send(embeds=[embed_a, embed_v])
 
     # -------------------- Commands --------------------
     @commands.command()
     async def leaderboard(self, ctx):
         """All-Time Leaderboard"""
-        await self._update_active_users_once()
-        await self.generate_leaderboard(ctx, self.activity_times, self.voice_times, alltime=True)
+        await self.generate_leaderboard(ctx, alltime=True)
 
     @commands.command()
     async def weeklytest(self, ctx):
         """Weekly Leaderboard with Daily Average"""
-        await self._update_active_users_once()
-        baseline = self._load_or_recalculate_baseline()
-        weekly_activities, weekly_voice = self._calculate_weekly_difference(
-            {"activity_times": self.activity_times, "voice_times": self.voice_times}, baseline
-        )
-        await self.generate_leaderboard(ctx, weekly_activities, weekly_voice, alltime=False)
+        await self.generate_leaderboard(ctx, alltime=False)
+
+    @commands.command()
+    async def verifybaseline(self, ctx):
+        """Rebuilds the weekly baseline from all backups and replaces it if it drifted"""
+        if ctx.author.id != int(settings.get("ADMIN_USER_ID", 0)):
+            await ctx.send("⛔ You don't have permission to use this command.", delete_after=5)
+            return
+
+        await ctx.send("🔄 Rebuilding baseline from backups...")
+        rebuilt, count = await asyncio.to_thread(self._combine_backups)
+        current = await self._get_baseline()
+        differences = self._count_baseline_differences(current, rebuilt)
+        if differences or count != current.get("_backup_count"):
+            self._set_baseline(rebuilt, count)
+            await ctx.send(f"⚠️ Baseline was out of date ({differences} differing entries), replaced it with the rebuild from {count} backups.")
+        else:
+            await ctx.send(f"✅ Baseline matches all {count} backups.")
 
     # -------------------- Weekly Leaderboard Task --------------------
     @tasks.loop(minutes=10)
@@ -282,37 +470,35 @@ class ActivityTracker(commands.Cog):
         if now.weekday() == 6 and now.hour == 0:  # Sunday 00:00 Berlin
             channel = self.bot.get_channel(self.leaderboard_channel_id)
             if channel:
-                await self._update_active_users_once()
+                self.sessions.settle(current_timestamp())
 
                 # Backup weekly
-                existing = [f for f in os.listdir(self.backup_dir) if f.startswith("weekly_data_")]
-                index = len(existing) + 1
+                index = self._count_backups() + 1
                 date_str = now.strftime("%d_%m_%Y")
-                backup_name = f"weekly_data_{index}_{date_str}.json"
+                backup_name = f"weekly_data_{index}_{date_str}{EXTENSION}"
                 backup_path = os.path.join(self.backup_dir, backup_name)
+                activity_copy, voice_copy = self._copy_state()
                 try:
-                    with open(backup_path, "w") as f:
-                        json.dump({"activity_times": self.activity_times, "voice_times": self.voice_times}, f, indent=4)
+                    await self._write_week(backup_path, activity_copy, voice_copy)
                     print(f"[weekly] Backup created: {backup_name}")
                 except Exception as e:
                     print(f"[weekly] Backup failed: {e}")
 
                 # Compute weekly leaderboard
-                baseline = self._load_or_recalculate_baseline()
-                weekly_activities, weekly_voice = self._calculate_weekly_difference(
-                    {"activity_times": self.activity_times, "voice_times": self.voice_times}, baseline
-                )
-                await self.generate_leaderboard(channel, weekly_activities, weekly_voice, alltime=False)
+                await self.generate_leaderboard(channel, alltime=False)
 
-                # Reset weekly totals
+                # Reset weekly totals, open sessions keep running from the settle above
                 for uid in self.activity_times:
                     for act in self.activity_times[uid].values():
                         act["main"] = 0
                         act["duplicate"] = 0
-                        act["ongoing_start"] = current_timestamp()
                 for v in self.voice_times.values():
                     v["total"] = 0
-                    v["ongoing_start"] = current_timestamp()
+                self._rebuild_ranks()
+                try:
+                    self.store.reset(self.activity_times, self.voice_times)
+                except Exception as e:
+                    print(f"[weekly] Saving reset failed: {e}")
 
 async def setup(bot):
     await bot.add_cog(ActivityTracker(bot))
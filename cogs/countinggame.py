@@ -1,101 +1,221 @@
+import asyncio
 import discord
 from discord.ext import commands
-import json
-import os
 from config import settings
+from utils.database import Database, get_database
+from utils.persistence import DebouncedWriter
 
-DATA_FILE = "counter.json"
 
- 
 
-class CountingGame(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
-        self.load_data()
+class CountingChannel:
+    """State of one counting channel.
 
+    Messages are queued by snowflake and handled by a single consumer task, so
+    the count is only ever read and changed by one coroutine at a time.
+    """
+    __slots__ = ("channel_id", "guild_id", "current_number", "last_user", "highscore", "queue", "worker")
 
+    def __init__(self, channel_id, guild_id=None, current_number=0, last_user=None, highscore=0):
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.current_number = current_number
+        self.last_user = last_user
+        self.highscore = highscore
+        self.queue = asyncio.PriorityQueue()  # (message.id, message)
+        self.worker = None
 
-    def load_data(self):
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, "r") as f:
-                self.data = json.load(f)
-        else:
-            self.data = {
-                "channel_id": settings["COUNTING_GAME_CHANNEL_ID"],
-                "current_number": 0,
-                "last_user": None,
-                "highscore": 0
-            }
+    def row(self):
+        return (self.channel_id, self.guild_id, self.current_number, self.last_user, self.highscore)
 
-    def save_data(self):   
-        with open(DATA_FILE, "w") as f:
-            json.dump(self.data, f, indent=4)
+
+class CountingGame(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.db = get_database()
+        self.channels = {}   # channel_id -> CountingChannel
+        self._dirty = set()  # channel ids changed since the last flush
+        # at most COUNTING_FLUSH_INTERVAL seconds of counting can be lost in a crash
+        self.writer = DebouncedWriter(
+            self.flush_data,
+            interval=settings.get("COUNTING_FLUSH_INTERVAL", 2.0),
+            max_updates=settings.get("COUNTING_FLUSH_EVERY", 25),
+        )
+        # messages arriving within this window are validated together, in snowflake order
+        self.batch_window = settings.get("COUNTING_BATCH_WINDOW", 0.05)
+
+    async def cog_load(self):
+        await self.load_data()
+        self.bot.message_router.subscribe("counting", self.on_message, channels=self.channels)
+
+    async def cog_unload(self):
+        self.bot.message_router.unsubscribe("counting")
+        for state in self.channels.values():
+            if state.worker is not None:
+                state.worker.cancel()
+        await self.writer.flush()
+
+    async def load_data(self):
+        rows = await self.db.counting_channels()
+        self.channels = {row[0]: CountingChannel(*row) for row in rows}
+
+    def save_data(self, state):
+        self._dirty.add(state.channel_id)
+        self.writer.touch()
+
+    async def flush_data(self):
+        dirty, self._dirty = self._dirty, set()
+        rows = [self.channels[c].row() for c in dirty if c in self.channels]
+        try:
+            await self.db.write(Database.save_counting_channels, rows)
+        except Exception:
+            self._dirty |= dirty
+            raise
 
 
 
     @commands.command()
     async def startcount(self, ctx):
-        """Set the counting channel and start the game."""
-        self.data["channel_id"] = ctx.channel.id
-        self.data["last_user"] = None
-        self.save_data()
+        """Make this channel a counting channel and start the game."""
+        state = self.channels.get(ctx.channel.id)
+        if state is None:
+            state = self.channels[ctx.channel.id] = CountingChannel(ctx.channel.id, ctx.guild.id if ctx.guild else None)
+            self.bot.message_router.set_channels("counting", self.channels)
+        state.last_user = None
+        self.save_data(state)
         await ctx.send("Counting game started! Start with 1.")
 
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def stopcount(self, ctx):
+        """Stop the counting game in this channel."""
+        state = self.channels.pop(ctx.channel.id, None)
+        if state is None:
+            await ctx.send("This is not a counting channel.")
+            return
+        self.bot.message_router.set_channels("counting", self.channels)
+        if state.worker is not None:
+            state.worker.cancel()
+        self._dirty.discard(state.channel_id)
+        await self.db.remove_counting_channel(state.channel_id)
+        await ctx.send(f"Counting game stopped. Highscore was {state.highscore}.")
+
     @commands.command()
     async def highscore(self, ctx):
         """displays highscore"""
-        hs = self.data["highscore"]
-        await ctx.send(f"highscore: {hs}")
-
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
+        state = self.channels.get(ctx.channel.id)
+        if state is not None:
+            await ctx.send(f"highscore: {state.highscore}")
             return
-        if message.content.startswith("!"):
-            #await self.bot.process_commands(message)
+        guild_id = ctx.guild.id if ctx.guild else None
+        scores = [s for s in self.channels.values() if s.guild_id in (guild_id, None)]
+        if not scores:
+            await ctx.send("No counting game running here. Use !startcount in a channel.")
             return
-        
-        if self.data["channel_id"] != message.channel.id :
+        lines = [f"<#{s.channel_id}>: {s.highscore}" for s in sorted(scores, key=lambda s: -s.highscore)]
+        await ctx.send("highscores:\n" + "\n".join(lines))
+
+    # Called by the message router, only for counting channels (no bots, no commands)
+    async def on_message(self, message):
+        state = self.channels.get(message.channel.id)
+        if state is None:
             return
 
-        # Try to convert message to integer
+        if state.guild_id is None and message.guild is not None:
+            state.guild_id = message.guild.id  # rows imported from counter.json have no guild yet
+        state.queue.put_nowait((message.id, message))
+        if state.worker is None or state.worker.done():
+            state.worker = asyncio.create_task(self.consume(state))
+
+    # -------------------- Per-channel pipeline --------------------
+    async def consume(self, state):
+        while True:
+            batch = [await state.queue.get()]
+            await asyncio.sleep(self.batch_window)  # let a burst (and late snowflakes) catch up
+            while not state.queue.empty():
+                batch.append(state.queue.get_nowait())
+            batch.sort(key=lambda item: item[0])
+
+            outcomes = [self.check_count(state, message) for _, message in batch]
+            await self.send_outcomes(state, batch, outcomes)
+
+    def check_count(self, state, message):
+        """Validate one message against the channel state and apply it.
+
+        Returns ``(reaction, delete, notice, warning)``. Nothing in here awaits,
+        so a batch is checked and applied atomically.
+        """
         # Check if same user twice
-        if message.author.id == self.data["last_user"] and message.content != "restart" and message.content != "test":    #id is for testing    and message.author.id != 681888551981547563
-            await message.delete()
-            await message.channel.send(f"{message.author.mention}, you cannot count twice in a row!",delete_after = 7)
+        if message.author.id == state.last_user and message.content != "restart" and message.content != "test":    #id is for testing    and message.author.id != 681888551981547563
             # Do NOT reset the count, just warn
+            return None, True, None, f"{message.author.mention}, you cannot count twice in a row!"
+
+        if message.content == "test" and message.author.id == 681888551981547563:
+            state.last_user = None
+            self.save_data(state)
+            return None, True, None, None
+
+        # Try to convert message to integer
+        try:
+            number = int(message.content)
+        except ValueError:
+            # Not a number → restart counting
+            state.current_number = 0
+            state.last_user = None
+            self.save_data(state)
+            return "⛔", False, f"{message.author.mention} broke the count! Restarting at 1.", None
+
+        # Check if correct number
+        if number != state.current_number + 1:
+            state.current_number = 0
+            state.last_user = None
+            self.save_data(state)
+            return "⛔", False, f"{message.author.mention} counted wrong! Restarting at 1.", None
+
+        # Correct count
+        state.current_number = number
+        state.last_user = message.author.id
+        # Update highscore
+        if number > state.highscore:
+            state.highscore = number
+        self.save_data(state)
+        return "✅", False, None, None
+
+    async def send_outcomes(self, state, batch, outcomes):
+        """Answer one batch with as few API calls as possible, one call at a time.
+
+        Every call is guarded on its own, a message deleted before its
+        reaction must not cost the rest of the batch its answers.
+        """
+        channel = batch[0][1].channel
+        to_delete = []
+        notices, warnings = [], []
+        for (_, message), (reaction, delete, notice, warning) in zip(batch, outcomes):
+            if delete:
+                to_delete.append(message)
+            if notice:
+                notices.append(notice)
+            if warning:
+                warnings.append(warning)
+            if reaction:
+                await self._answer(state, message.add_reaction(reaction))
+
+        if len(to_delete) == 1:
+            await self._answer(state, to_delete[0].delete())
+        elif to_delete:
+            await self._answer(state, channel.delete_messages(to_delete))
+        if warnings:
+            await self._answer(state, channel.send("\n".join(warnings), delete_after=7))
+        if notices:
+            await self._answer(state, channel.send("\n".join(notices)))
+
+    @staticmethod
+    async def _answer(state, call):
+        try:
+            await call
+        except discord.NotFound:
+            pass  # the message is already gone
+        except discord.HTTPException as e:
+            print(f"[counting] Failed to answer in {state.channel_id}: {e}")
 
-        else:
-            if message.content == "test" and message.author.id == 681888551981547563:
-                self.data["last_user"] = None
-                await message.delete()
-            else:
-                try:
-                    number = int(message.content)
-                    # Check if correct number
-                    if number != self.data["current_number"] + 1:
-                        self.data["current_number"] = 0
-                        self.data["last_user"] = None
-                        await message.add_reaction("⛔")
-                        await message.channel.send(f"{message.author.mention} counted wrong! Restarting at 1.")
-                    
-                    else:
-                        # Correct count
-                        await message.add_reaction("✅")
-                        self.data["current_number"] = number
-                        self.data["last_user"] = message.author.id
-
-                        # Update highscore
-                        if number > self.data["highscore"]:
-                            self.data["highscore"] = number
-
-                except ValueError:
-                    # Not a number → restart counting
-                    self.data["current_number"] = 0
-                    self.data["last_user"] = None
-                    await message.add_reaction("⛔")
-                    await message.channel.send(f"{message.author.mention} broke the count! Restarting at 1.")
-        
-        self.save_data()
 async def setup(bot: commands.Bot):
-    await bot.add_cog(CountingGame(bot))
\ No newline at end of file
+    await bot.add_cog(CountingGame(bot))
@@ -5,6 +5,9 @@ import traceback
 from config import settings as config
 import io
 import asyncio
+import time
+from discord.ext import tasks
+from utils.error_reports import ErrorWindow, fingerprint
 
 
 class ErrorHandler(commands.Cog):
@@ -13,6 +16,24 @@ class ErrorHandler(commands.Cog):
         # Register global slash command error handler
         self.bot.tree.on_error = self.on_app_command_error
 
+        # identical errors are reported once per window, repeats are only counted
+        self.window = ErrorWindow(config.get("ERROR_DEDUPE_WINDOW", 300))
+        # delivery runs in one worker, when it falls behind new reports are dropped
+        self.queue = asyncio.Queue(maxsize=config.get("ERROR_QUEUE_SIZE", 20))
+        self.dropped = 0
+        self.worker = None
+        self._channel = None
+        self._user = None
+        self.send_summaries.start()
+
+    async def cog_load(self):
+        self.worker = asyncio.create_task(self.deliver())
+
+    async def cog_unload(self):
+        self.send_summaries.cancel()
+        if self.worker is not None:
+            self.worker.cancel()
+
     # Slash command (app command) errors
     async def on_app_command_error(
         self, interaction: discord.Interaction, error: app_commands.AppCommandError
@@ -67,7 +88,15 @@ class ErrorHandler(commands.Cog):
 
         tb = tb or "No traceback available."
 
-        # Always log to console
+        # Deduplicate before anything touches Discord (or floods the console)
+        now = time.monotonic()
+        fp = fingerprint(error)
+        title = tb.strip().splitlines()[-1][:200] if tb.strip() else "Error"
+        report, count = self.window.record(fp, now, title)
+        if not report:
+            print(f"[error] {fp} repeated ({count} since the last report): {title}")
+            return
+
         print("------ ERROR TRACEBACK ------")
         print(tb)
         print("-----------------------------")
@@ -78,59 +107,106 @@ class ErrorHandler(commands.Cog):
             description=f"```py\n{tb[:2000]}\n```",
             color=discord.Color.red(),
         )
+        if count > 1:
+            embed.add_field(name="Repeated", value=f"×{count} since the last report", inline=False)
 
         if ctx:
             cmd_name = getattr(ctx.command, "qualified_name", "Unknown")
             embed.add_field(name="Command", value=cmd_name, inline=False)
             guild_text = ctx.guild.name if ctx.guild else "DMs"
-            embed.set_footer(text=f"User: {ctx.author} | Guild: {guild_text}")
+            embed.set_footer(text=f"User: {ctx.author} | Guild: {guild_text} | {fp}")
 
         elif interaction:
             cmd_name = getattr(interaction.command, "name", "Unknown")
             embed.add_field(name="Command", value=cmd_name, inline=False)
             guild_text = interaction.guild.name if interaction.guild else "DMs"
-            embed.set_footer(text=f"User: {interaction.user} | Guild: {guild_text}")
+            embed.set_footer(text=f"User: {interaction.user} | Guild: {guild_text} | {fp}")
 
         elif event:
             embed.add_field(name="Event", value=event, inline=False)
-            embed.set_footer(text="Error in event loop")
+            embed.set_footer(text=f"Error in event loop | {fp}")
 
-        # Determine if traceback needs a file
-        file_needed = len(tb) > 2000
+        # Attach the full traceback when it does not fit into the embed
+        self.enqueue(embed, tb if len(tb) > 2000 else None)
 
-        @staticmethod
-        def make_file() -> discord.File:
-            return discord.File(io.BytesIO(tb.encode()), filename="traceback.txt")
+    def window_text(self):
+        window = self.window.window
+        return f"{window // 60} min" if window >= 60 else f"{window} s"
 
-        # Send to error channel
+    def enqueue(self, embed, tb=None):
+        try:
+            self.queue.put_nowait((embed, tb))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print(f"⚠️ Error report queue full, dropped {self.dropped} report(s) so far")
+
+    @tasks.loop(seconds=60)
+    async def send_summaries(self):
+        for fp, title, suppressed in self.window.due_summaries(time.monotonic()):
+            embed = discord.Embed(
+                title="🔁 Repeated Bot Error",
+                description=f"```py\n{title}\n```",
+                color=discord.Color.orange(),
+            )
+            embed.add_field(name="Repeated", value=f"×{suppressed} more within {self.window_text()} of the last report", inline=False)
+            embed.set_footer(text=fp)
+            self.enqueue(embed)
+
+    @send_summaries.before_loop
+    async def before_send_summaries(self):
+        await self.bot.wait_until_ready()
+
+    # -------------------- Delivery --------------------
+    async def get_error_channel(self):
         channel_id = config.get("ERROR_CHANNEL_ID")
-        if channel_id:
+        if not channel_id:
+            return None
+        if self._channel is None or self._channel.id != int(channel_id):
+            self._channel = self.bot.get_channel(int(channel_id)) or await self.bot.fetch_channel(int(channel_id))
+        return self._channel
+
+    async def get_error_user(self):
+        user_id = config.get("ERROR_USER_ID")
+        if not user_id:
+            return None
+        if self._user is None or self._user.id != int(user_id):
+            self._user = self.bot.get_user(int(user_id)) or await self.bot.fetch_user(int(user_id))
+        return self._user
+
+    async def deliver(self):
+        while True:
+            embed, tb = await self.queue.get()
+
+            def make_file():
+                return discord.File(io.BytesIO(tb.encode()), filename="traceback.txt")
+
+            # Send to error channel
             try:
-                channel = await self.bot.fetch_channel(int(channel_id))
-                if file_needed:
+                channel = await self.get_error_channel()
+                if channel is None:
+                    print("⚠️ Error channel not found or invalid ID.")
+                elif tb:
                     await channel.send(embed=embed, file=make_file())
                 else:
                     await channel.send(embed=embed)
             except Exception as e:
+                self._channel = None
                 print(f"⚠️ Failed to send error to channel: {e}")
-        else:
-            print("⚠️ Error channel not found or invalid ID.")
 
-        # DM designated user
-        user_id = config.get("ERROR_USER_ID")
-        if user_id:
+            # DM designated user
             try:
-                user = await self.bot.fetch_user(int(user_id))
-                if file_needed:
+                user = await self.get_error_user()
+                if user is None:
+                    print("⚠️ Error user not found or invalid ID.")
+                elif tb:
                     await user.send(embed=embed, file=make_file())
                 else:
                     await user.send(embed=embed)
             except discord.Forbidden:
                 print("⚠️ Could not DM the error user.")
             except Exception as e:
+                self._user = None
                 print(f"⚠️ Failed to send error to user: {e}")
-        else:
-            print("⚠️ Error user not found or invalid ID.")
 
 
 async def setup(bot: commands.Bot):
@@ -1,48 +1,32 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import json
 import ast
-from config import save_config
+from config import ConfigError
 from config import settings as config
+from config import store as config_store
 import asyncio
-import os
-import shutil
 from datetime import datetime
-import zipfile
+from utils.backup import TIMESTAMP, backups
+from utils.log_sink import log_sink
+from utils.persistence import persistence
+from utils.database import get_database
+from utils.purge import purge
+from utils.role_panel import DEFAULT_ROLE_PANEL, STATE_KEY as ROLE_PANEL_KEY, render_panel, sync_panel
 
 class General(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    # ---- Helper to update presence ----
-    async def update_presence(self):
-        # Get current STATUS
-        stat_index = config.get("STATUS", [0, ["online"]])[0]
-        stat_list = config.get("STATUS", [0, ["online"]])[1]
-        status_name = stat_list[stat_index] if 0 <= stat_index < len(stat_list) else "online"
-        status_enum = getattr(discord.Status, status_name.lower(), discord.Status.online)
-
-        # Get current ACTIVITY_TYPE
-        type_index = config.get("ACTIVITY_TYPE", [0, ["playing"]])[0]
-        type_list = config.get("ACTIVITY_TYPE", [0, ["playing"]])[1]
-        activity_type_name = type_list[type_index] if 0 <= type_index < len(type_list) else "playing"
-
-        type_enum_map = {
-            "playing": discord.ActivityType.playing,
-            "listening": discord.ActivityType.listening,
-            "watching": discord.ActivityType.watching,
-            "streaming": discord.ActivityType.streaming,
-            "competing": discord.ActivityType.competing
-        }
-        activity_type_enum = type_enum_map.get(activity_type_name.lower(), discord.ActivityType.playing)
-
-        # Get activity string
-        activity_str = str(config.get("ACTIVITY", "!help"))
-        activity = discord.Activity(type=activity_type_enum, name=activity_str)
-
-        await self.bot.change_presence(status=status_enum, activity=activity)
-
-    # ---- General Commands ----
+    async def cog_load(self):
+        hours = config.get("BACKUP_INTERVAL_HOURS", 24)
+        if hours > 0:
+            self.scheduled_backup.change_interval(hours=hours)
+            self.scheduled_backup.start()
+
+    def cog_unload(self):
+        self.scheduled_backup.cancel()
+
     @commands.command()
     async def echo(self, ctx, *, message: str):
         if not message:
@@ -57,51 +41,49 @@ class General(commands.Cog):
             await ctx.send("⛔ You don't have permission to use this command.", delete_after=5)
             return
 
-        amount = min(max(amount, 1), 100)
-        messages = [msg async for msg in ctx.channel.history(limit=amount + 1)]
+        amount = min(max(amount, 1), config.get("CLEAR_MAX", 1000))
+        status = await ctx.send(f"🧹 Deleting {amount} messages...")
 
-        deleted_count = 0
-        for msg in messages:
+        async def progress(result):
             try:
-                await msg.delete()
-                deleted_count += 1
-            except discord.NotFound:
-                continue
-            except discord.Forbidden:
-                await ctx.send("⛔ I don't have permission to delete some messages.", delete_after=5)
-                break
+                await status.edit(content=f"🧹 Deleted {max(result.deleted - 1, 0)}/{amount} messages...")
             except discord.HTTPException:
-                continue
+                pass
+
+        # +1 for the command message itself, the status message is newer and stays
+        result = await purge(ctx.channel, amount + 1, before=status, progress=progress)
 
-        await ctx.send(f"✅ Deleted {max(deleted_count - 1, 0)} messages.", delete_after=5)
+        if result.forbidden:
+            await ctx.send("⛔ I don't have permission to delete some messages.", delete_after=5)
+        failed = f" ({result.failed} failed)" if result.failed else ""
+        await status.edit(content=f"✅ Deleted {max(result.deleted - 1, 0)} messages.{failed}", delete_after=5)
 
     @commands.command()
     async def setuproles(self, ctx):
         if ctx.channel.id == config["ROLE_CHANNEL_ID"] and ctx.author.guild_permissions.administrator:
-            deleted = await ctx.channel.purge(limit=100)
-            await ctx.send(f"{len(deleted)} Nachrichten gelöscht.", delete_after=5)
-            await ctx.send("In diesem Channel kannst du dir Rollen vergeben, so kannst du Entscheiden was dich interressiert.")
-            await ctx.send("Reagiere mit :thumbsup: um eine Rolle zu erhalten bzw. entferne die Reaktion um sie zu verlieren.")
-            await ctx.send("-----------------------------------------------------------------------------------------------------------------------------")
-            await ctx.send("-----------------------------------------------------------------------------------------------------------------------------")
-            await ctx.send(":a: ALLGEMEIN:")
-            await ctx.send("------------------------")
-            await ctx.send("Gooner")
-            await ctx.send("---> Mit dieser Rolle erlangst du Einblick in alle Channel")
-            await ctx.send("------------")
-            await ctx.send("Informatik-Junkie")
-            await ctx.send("------------")
-            await ctx.send(":b: Spiele:")
-            await ctx.send("------------------------")
-            await ctx.send("Minecraft")
-            await ctx.send("------------")
-            await ctx.send("Terraria")
-            await ctx.send("------------")
-            await ctx.send("Satisfactory")
-            await ctx.send("------------")
-            await ctx.send("PEAK")
-            await ctx.send("------------")
-            await ctx.send("Riot-Games")
+            db = get_database()
+            state = await db.get_state(ROLE_PANEL_KEY, {})
+            message_ids = state.get("message_ids", []) if state.get("channel_id") == ctx.channel.id else []
+
+            try:
+                await ctx.message.delete()
+            except discord.HTTPException:
+                pass
+            if not message_ids:
+                # first run: remove the old hand-written panel
+                result = await purge(ctx.channel, 100)
+                await ctx.send(f"{result.deleted} Nachrichten gelöscht.", delete_after=5)
+
+            # the panel is diffed against what is posted, re-running only edits what changed
+            rendered = render_panel(config.get("ROLE_PANEL", DEFAULT_ROLE_PANEL))
+            messages = await sync_panel(ctx.channel, rendered, message_ids)
+            await db.set_state(ROLE_PANEL_KEY, {"channel_id": ctx.channel.id, "message_ids": [m.id for m in messages]})
+
+            roles_cog = self.bot.get_cog("ReactionRoleCog")
+            if roles_cog is not None:
+                for message in messages:
+                    roles_cog.index.add_message(ctx.guild.id, message.id, message.content)
+            await ctx.send(f"✅ Rollen-Panel aktuell ({len(messages)} Nachricht(en)).", delete_after=5)
 
     def is_config_channel(self, ctx):
         return ctx.channel.id == config["CONFIG_CHANNEL_ID"]
@@ -122,11 +104,14 @@ class General(commands.Cog):
             embed.add_field(name="!addlistc <key> <wert>", value="Fügt <wert> zu einer LISTE hinzu", inline=False)
             embed.add_field(name="!remlistc <key> <wert>", value="Entfernt <wert> von einer LISTE", inline=False)
             embed.add_field(name="!showc", value="Zeigt die gesamte Config an", inline=False)
-            embed.add_field(name="!clear <amount>", value="[RESTRICTED] deletes <amount> messages in the current channel, max 100", inline=False)
+            embed.add_field(name="!iostats", value="Zeigt Warteschlange und Latenz der Dateischreibvorgänge, des Log-Puffers und der Message-Handler an", inline=False)
+            embed.add_field(name="!rolecache", value="Zeigt Treffer/Fehlgriffe der Rollen-Caches an", inline=False)
+            embed.add_field(name="!clear <amount>", value="[RESTRICTED] deletes <amount> messages in the current channel, max 1000 (CLEAR_MAX)", inline=False)
             embed.add_field(name="!reload <cog>", value="[RESTRICTED] reloads <cog>, reloads all when no cog is given", inline=False)
             embed.add_field(name="!shutdown", value="[RESTRICTED] shuts the bot down safely", inline=False)
-            embed.add_field(name="!backup", value="[RESTRICTED] creates a zip backup of all .json files", inline=False)
+            embed.add_field(name="!backup", value="[RESTRICTED] creates a deduplicated backup of the data files and database (BACKUP_INTERVAL_HOURS for scheduled ones)", inline=False)
             embed.add_field(name="!weeklytest", value="[RESTRICTED] creates leaderboard with weekly data", inline=False)
+            embed.add_field(name="!verifybaseline", value="[RESTRICTED] rebuilds the weekly baseline from all backups and repairs it if needed", inline=False)
         else:
             embed.description = "Hier sind die allgemeinen Bot-Befehle:"
             embed.add_field(name="!echo <nachricht>", value="Bot wiederholt deine Nachricht", inline=False)
@@ -134,6 +119,8 @@ class General(commands.Cog):
             embed.add_field(name="!leaderboard", value="showes alltime-playtime leaderboard", inline=False)
             embed.add_field(name="!addbirthday <MM-DD>", value="Speichert deinen Geburtstag, um dich daran zu erinnern", inline=False)
             embed.add_field(name="!removebirthday", value="Löscht deinen gespeicherten Geburtstag", inline=False)
+            embed.add_field(name="!startcount / !stopcount", value="Startet bzw. beendet das Zählspiel im aktuellen Channel", inline=False)
+            embed.add_field(name="!highscore", value="shows the counting highscore of this channel, or of all counting channels", inline=False)
 
         embed.add_field(name="SEE FULL DOCUMENTATION", value="https://github.com/timjhaa/Cog-Powered-Discord-Bot", inline=False)
         embed.set_footer(text=f"Angefordert von {ctx.author}", icon_url=ctx.author.avatar.url if ctx.author.avatar else None)
@@ -142,25 +129,34 @@ class General(commands.Cog):
     @commands.command()
     async def getc(self, ctx, key: str):
         if self.is_config_channel(ctx):
-            if key in config:
-                await ctx.send(f"{key} = {config[key]}")
+            current = config_store.current
+            if key in current:
+                await ctx.send(f"{key} = {current.thaw()[key]}")
             else:
                 await ctx.send("Wrong Key")
 
+    async def _update_config(self, ctx, changes):
+        """Validate and apply ``changes``; tells the user and returns False if they were rejected."""
+        try:
+            config_store.update(changes)
+        except ConfigError as e:
+            await ctx.send(f"⚠️ Ungültiger Wert: {e}")
+            return False
+        return True
+
     @commands.command()
     async def setc(self, ctx, key: str, *, value: str):
         if not self.is_config_channel(ctx):
             return
 
-        if key in ["servernamelist_sec", "filter_list", "nni", "gni"]:
-            await ctx.send(f"{key} ist eine Liste, anderer Befehl wird erwartet.")
-            return
-
-        if key not in config:
+        current = config_store.current
+        if key not in current:
             await ctx.send("Key does not exist.")
             return
 
-        old_value = config[key]
+        if isinstance(current[key], tuple) and key not in ["STATUS", "ACTIVITY_TYPE"]:
+            await ctx.send(f"{key} ist eine Liste, anderer Befehl wird erwartet.")
+            return
 
         # ---- Handle STATUS or ACTIVITY_TYPE as 2D list ----
         if key in ["STATUS", "ACTIVITY_TYPE"]:
@@ -170,20 +166,14 @@ class General(commands.Cog):
                 await ctx.send(f"⚠️ {key} index must be a number!")
                 return
 
-            lst = config[key][1]
+            lst = current.thaw()[key][1]
             if not 0 <= index < len(lst):
                 await ctx.send(f"⚠️ Invalid index! Must be between 0 and {len(lst)-1}")
                 return
 
-            try:
-                config[key][0] = index
-                await self.update_presence()
-                save_config(config)
+            # the presence manager picks the change up through its config subscription
+            if await self._update_config(ctx, {key: [index, lst]}):
                 await ctx.send(f"✅ {key} changed to `{lst[index]}`")
-            except Exception as e:
-                config[key] = old_value
-                save_config(config)
-                await ctx.send(f"⚠️ Failed to set {key}: {e}. Old value restored.")
             return
 
         # ---- Handle normal values ----
@@ -195,18 +185,13 @@ class General(commands.Cog):
         else:
             new_value = value
 
-        config[key] = new_value
-        save_config(config)
-
-        if key == "prefix":
-            self.bot.command_prefix = config[key]
-
-        await ctx.send(f"{key} wurde auf '{new_value}' geändert.")
+        if await self._update_config(ctx, {key: new_value}):
+            await ctx.send(f"{key} wurde auf '{new_value}' geändert.")
 
     @commands.command()
     async def setlistc(self, ctx, key: str, *, value: str):
         if self.is_config_channel(ctx):
-            if key in config and isinstance(config[key], list):
+            if isinstance(config_store.current.get(key), tuple):
                 try:
                     parsed_value = ast.literal_eval(value)
                 except (ValueError, SyntaxError):
@@ -217,11 +202,8 @@ class General(commands.Cog):
                     for i in range(len(parsed_value)):
                         if isinstance(parsed_value[i], str) and parsed_value[i].isdigit():
                             parsed_value[i] = int(parsed_value[i])
-                    config[key] = parsed_value
-                    save_config(config)
-                    await ctx.send(f"{key} wurde auf '{parsed_value}' geändert.")
-                    if key == "prefix":
-                        self.bot.command_prefix = parsed_value
+                    if await self._update_config(ctx, {key: parsed_value}):
+                        await ctx.send(f"{key} wurde auf '{parsed_value}' geändert.")
                 else:
                     await ctx.send("Falsche Eingabe!")
             else:
@@ -230,13 +212,12 @@ class General(commands.Cog):
     @commands.command()
     async def addlistc(self, ctx, key: str, *, value: str):
         if self.is_config_channel(ctx):
-            if key in config and isinstance(config[key], list):
+            current = config_store.current.get(key)
+            if isinstance(current, tuple):
                 value_to_add = int(value) if value.isdigit() else value
-                if value_to_add in config[key]:
+                if value_to_add in current:
                     await ctx.send(f"'{value_to_add}' ist bereits in {key}.")
-                else:
-                    config[key].append(value_to_add)
-                    save_config(config)
+                elif await self._update_config(ctx, {key: [*current, value_to_add]}):
                     await ctx.send(f"'{value_to_add}' wurde zu {key} hinzugefügt.")
             else:
                 await ctx.send(f"'{key}' ist keine Liste in der Config.")
@@ -244,12 +225,14 @@ class General(commands.Cog):
     @commands.command()
     async def remlistc(self, ctx, key: str, *, value: str):
         if self.is_config_channel(ctx):
-            if key in config and isinstance(config[key], list):
+            current = config_store.current.get(key)
+            if isinstance(current, tuple):
                 value_to_remove = int(value) if value.isdigit() else value
-                if value_to_remove in config[key]:
-                    config[key].remove(value_to_remove)
-                    save_config(config)
-                    await ctx.send(f"'{value_to_remove}' wurde aus {key} entfernt.")
+                if value_to_remove in current:
+                    remaining = list(current)
+                    remaining.remove(value_to_remove)
+                    if await self._update_config(ctx, {key: remaining}):
+                        await ctx.send(f"'{value_to_remove}' wurde aus {key} entfernt.")
                 else:
                     await ctx.send(f"'{value_to_remove}' ist nicht in {key} enthalten.")
             else:
@@ -258,7 +241,7 @@ class General(commands.Cog):
     @commands.command()
     async def showc(self, ctx):
         if self.is_config_channel(ctx):
-            await ctx.send("```json\n" + json.dumps(config, indent=4, ensure_ascii=False) + "```")
+            await ctx.send("```json\n" + json.dumps(config_store.current.thaw(), indent=4, ensure_ascii=False) + "```")
 
     @commands.command()
     async def backup(self, ctx):
@@ -267,32 +250,58 @@ class General(commands.Cog):
             await ctx.send("⛔ You don't have permission to use this command.", delete_after=5)
             return
 
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        cog_dir = os.path.join(base_dir, "cogs")
-        backup_root = os.path.join(base_dir, "backups")
-        os.makedirs(backup_root, exist_ok=True)
-
-        temp_folder = os.path.join(backup_root, f"backup_{timestamp}")
-        os.makedirs(temp_folder, exist_ok=True)
-
-        json_files = []
-        for folder in [base_dir, cog_dir]:
-            for file in os.listdir(folder):
-                if file.endswith(".json"):
-                    src_path = os.path.join(folder, file)
-                    dest_path = os.path.join(temp_folder, f"{file}")
-                    shutil.copy2(src_path, dest_path)
-                    json_files.append(file)
-
-        zip_filename = os.path.join(backup_root, f"backup_{timestamp}.zip")
-        with zipfile.ZipFile(zip_filename, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for file in os.listdir(temp_folder):
-                zipf.write(os.path.join(temp_folder, file), arcname=file)
+        summary = await backups.run(config)
+        removed, _ = summary["pruned"]
+        await ctx.send(
+            f"✅ Backup erstellt: `{summary['name']}` mit {summary['files']} Dateien "
+            f"({summary['new']} neu, {summary['reused']} unverändert, {summary['written'] / 1024:.0f} KiB geschrieben, "
+            f"{summary['seconds']:.1f}s)." + (f" {removed} alte Backups entfernt." if removed else "")
+        )
 
-        shutil.rmtree(temp_folder)
+    # -------------------- Scheduled backup --------------------
+    @tasks.loop(hours=24)
+    async def scheduled_backup(self):
+        try:
+            await backups.run(config)
+        except Exception as e:
+            print(f"[backup] Scheduled backup failed: {e!r}")
+
+    @scheduled_backup.before_loop
+    async def before_scheduled_backup(self):
+        await self.bot.wait_until_ready()
+        # due one interval after the newest backup, so frequent restarts can't keep pushing it back
+        interval = self.scheduled_backup.minutes * 60 + self.scheduled_backup.hours * 3600
+        names = await persistence.run(backups.store(config).list)
+        if names:
+            elapsed = (datetime.now() - datetime.strptime(names[-1], TIMESTAMP)).total_seconds()
+            await asyncio.sleep(max(interval - elapsed, 0))
 
-        await ctx.send(f"✅ Backup erstellt: `{os.path.basename(zip_filename)}` mit {len(json_files)} Dateien.")
+    @commands.command()
+    async def iostats(self, ctx):
+        if self.is_config_channel(ctx):
+            stats = persistence.stats()
+            await ctx.send(
+                f"💾 Queue: {stats['queued']} queued, {stats['in_flight']} writing (max {stats['max_depth']})\n"
+                f"Writes: {stats['writes']} ({stats['coalesced']} coalesced, {stats['failures']} failed)\n"
+                f"Latency: avg {stats['avg_ms']:.1f} ms, last {stats['last_ms']:.1f} ms, max {stats['max_ms']:.1f} ms"
+            )
+            logs = log_sink.stats()
+            await ctx.send(
+                f"📜 Log: {logs['queued']} queued, {logs['logged']} logged, {logs['sent']} messages sent, "
+                f"{logs['dropped']} dropped, {logs['failures']} failed"
+            )
+            presence = self.bot.presence.stats()
+            await ctx.send(
+                f"🟢 Presence: {presence['requests']} requests, {presence['sends']} sent, "
+                f"{presence['skipped']} unchanged, {presence['coalesced']} coalesced, {presence['failures']} failed"
+            )
+            routes = [
+                f"📨 {r['name']} ({r['channels']} channels): {r['calls']} calls, {r['errors']} errors, "
+                f"avg {r['avg_ms']:.2f} ms, max {r['max_ms']:.2f} ms"
+                for r in self.bot.message_router.stats()
+            ]
+            if routes:
+                await ctx.send("\n".join(routes))
 
 async def setup(bot):
     await bot.add_cog(General(bot))
@@ -1,25 +1,36 @@
 import discord
 from discord.ext import commands
-from config import settings
+from config import store as config_store
+from utils.triggers import TriggerMatcher, load_triggers
 class WortErkennung(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.matcher = TriggerMatcher(load_triggers(config_store.current))
 
+    async def cog_load(self):
+        # only recompiled when one of the trigger keys changes
+        config_store.subscribe("triggers", self.rebuild_matcher, keys=["TRIGGERS", "trigger_word", "TRIGGER_MESSAGE"])
+        # commands are checked too, a trigger word inside a command still counts
+        self.bot.message_router.subscribe("triggers", self.on_message, commands=True)
 
-    # Event Listener for messages
-    @commands.Cog.listener()
+    async def cog_unload(self):
+        self.bot.message_router.unsubscribe("triggers")
+        config_store.unsubscribe("triggers")
+
+    def rebuild_matcher(self, snapshot):
+        self.matcher = TriggerMatcher(load_triggers(snapshot))
+
+    # Called by the message router (bot messages are already filtered out)
     async def on_message(self, message):
-        # Ignore Bot messages
-        if message.author == self.bot.user or message.author.bot:
+        #is one of the triggers in message
+        trigger = self.matcher.match(message.channel.id, message.content)
+        if trigger is None:
             return
-        
-        trigger_wort = settings["trigger_word"]
-        tm = settings["TRIGGER_MESSAGE"]
-        #is trigger_word in message
-        if trigger_wort in message.content.lower():
+        if trigger.delete:
             await message.delete()
-            await message.channel.send(f"{tm}")
+        if trigger.response:
+            await message.channel.send(f"{trigger.response}")
 
 # Setup-Funktion for Cog
 async def setup(bot):
-    await bot.add_cog(WortErkennung(bot))
\ No newline at end of file
+    await bot.add_cog(WortErkennung(bot))
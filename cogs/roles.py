@@ -1,7 +1,13 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from config import settings as config
 from config import sendlog
+from config import store as config_store
+from utils.log_sink import log_sink, pack_lines
+from utils.database import get_database
+from utils.role_index import RoleIndex
+from utils.role_panel import STATE_KEY as ROLE_PANEL_KEY
+from utils.role_queue import RoleChangeQueue
 
 
 class ReactionRoleCog(commands.Cog):
@@ -9,72 +15,259 @@ class ReactionRoleCog(commands.Cog):
         self.bot = bot
         self.config = config
         self.logchannel_id = config["LOG_CHANNEL_ID"]  # ID speichern, kein Objekt
+        self.role_channel_id = config["ROLE_CHANNEL_ID"]
+        self.config_channel_id = config["CONFIG_CHANNEL_ID"]
+
+        # (guild_id, message_id) -> Rolle, wird beim Start aus dem Verlauf aufgebaut
+        self.index = RoleIndex(config.get("ROLE_MESSAGE_CACHE_SIZE", 512))
+        self.member_hits = 0
+        self.member_misses = 0
+
+        # Rollenänderungen werden gesammelt und pro Member mit einem Edit angewendet
+        self.queue = RoleChangeQueue()
+        self.channel_lines = []  # Digest für den Rollenchannel, der Logchannel läuft über den Log-Sink
+        self.apply_role_changes.change_interval(seconds=config.get("ROLE_QUEUE_INTERVAL", 1.0))
+        self.send_digest.change_interval(seconds=config.get("ROLE_LOG_INTERVAL", 10))
+        self.apply_role_changes.start()
+        self.send_digest.start()
+
+    async def cog_load(self):
+        self.bot.message_router.subscribe(
+            "roles", self.on_message, channels=[self.role_channel_id], commands=True, bots=True
+        )
+        config_store.subscribe(
+            "roles", self.apply_config, keys=["LOG_CHANNEL_ID", "ROLE_CHANNEL_ID", "CONFIG_CHANNEL_ID"]
+        )
+        self.bot.lifecycle.on_startup("roles", self.rebuild_index)
+        self.bot.lifecycle.on_reconnect("roles", self.reindex_roles)
+        if self.bot.is_ready():  # reload: der Start ist schon vorbei
+            self.bot.loop.create_task(self.rebuild_index())
+
+    async def cog_unload(self):
+        self.bot.message_router.unsubscribe("roles")
+        config_store.unsubscribe("roles")
+        self.bot.lifecycle.remove("roles")
+        self.apply_role_changes.cancel()
+        self.send_digest.cancel()
+        await self.apply_pending()
+        await self.flush_digest()
+        await log_sink.flush()
+
+    def apply_config(self, snapshot):
+        """Neue Channel-IDs übernehmen, statt sie bei jedem Event nachzuschlagen."""
+        self.logchannel_id = snapshot["LOG_CHANNEL_ID"]
+        self.config_channel_id = snapshot["CONFIG_CHANNEL_ID"]
+        if snapshot["ROLE_CHANNEL_ID"] != self.role_channel_id:
+            self.role_channel_id = snapshot["ROLE_CHANNEL_ID"]
+            self.bot.message_router.set_channels("roles", [self.role_channel_id])
+            self.index.messages.clear()
+            if self.bot.is_ready():
+                self.bot.loop.create_task(self.rebuild_index())
 
     def get_logchannel(self):
         """Gibt das TextChannel-Objekt zurück"""
         return self.bot.get_channel(self.logchannel_id)
 
+    # -------------------- Resolution (Cache zuerst, REST nur bei Miss) --------------------
+    async def resolve_member(self, guild, user_id, member=None):
+        """Member aus dem Payload oder Gateway-Cache, sonst per REST."""
+        if member is None:
+            member = guild.get_member(user_id)
+        if member is not None:
+            self.member_hits += 1
+            return member
+        self.member_misses += 1
+        try:
+            return await guild.fetch_member(user_id)
+        except discord.NotFound:
+            return None
+
+    async def resolve_role(self, guild, channel, message_id, emoji):
+        """(Rollenname, Rolle) für eine Reaktion, aus dem Index; REST nur bei unbekannter Nachricht."""
+        mapping = self.index.get_message(guild.id, message_id)
+        if mapping is None:
+            message = await channel.fetch_message(message_id)
+            mapping = self.index.add_message(guild.id, message_id, message.content)
+        role_name, role_id = self.index.resolve(guild.id, mapping, emoji)
+        return role_name, (guild.get_role(role_id) if role_id else None)
+
+    # -------------------- Index aktuell halten --------------------
+    async def rebuild_index(self):
+        for guild in self.bot.guilds:
+            self.index.index_roles(guild)
+        channel = self.bot.get_channel(self.role_channel_id)
+        if channel is None:
+            print("❌ Rollenchannel nicht gefunden!")
+            return
+        panel = await get_database().get_state(ROLE_PANEL_KEY, {})
+        panel_ids = set(panel.get("message_ids", []))
+        count = 0
+        async for message in channel.history(limit=None, oldest_first=True):
+            if message.author == self.bot.user and message.id not in panel_ids:
+                continue  # eigene Bestätigungen, keine Rollen-Nachrichten
+            self.index.add_message(channel.guild.id, message.id, message.content)
+            count += 1
+        print(f"[roles] {count} Rollen-Nachrichten indiziert")
+
+    async def reindex_roles(self):
+        # nach einem Reconnect sind die Guild-Objekte neu, die Rollen können sich geändert haben
+        for guild in self.bot.guilds:
+            self.index.index_roles(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.index.index_roles(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        self.index.role_created(role)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        self.index.role_updated(before, after)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.index.role_deleted(role)
+
+    # Called by the message router for the role channel
+    async def on_message(self, message):
+        if message.guild is None:
+            return
+        if message.author != self.bot.user:
+            self.index.add_message(message.guild.id, message.id, message.content)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if payload.channel_id != self.role_channel_id or payload.guild_id is None:
+            return
+        content = payload.data.get("content")
+        if content is None:
+            self.index.remove_message(payload.guild_id, payload.message_id)  # embed-only update, fetch again next time
+        else:
+            self.index.add_message(payload.guild_id, payload.message_id, content)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.channel_id == self.role_channel_id and payload.guild_id is not None:
+            self.index.remove_message(payload.guild_id, payload.message_id)
+
+    # -------------------- Rollen-Queue --------------------
+    async def apply_pending(self):
+        for member, changes in self.queue.drain():
+            member = member.guild.get_member(member.id) or member  # aktuelle Rollen aus dem Cache
+            adds, removes = self.queue.net_changes(member, changes)
+            if not adds and not removes:
+                continue
+            # einzelne Rollen statt der ganzen Liste, gleichzeitige Änderungen anderer bleiben erhalten
+            effective = []
+            for roles, add in ((adds, True), (removes, False)):
+                if not roles:
+                    continue
+                try:
+                    if add:
+                        await member.add_roles(*roles, reason="Reaction roles")
+                    else:
+                        await member.remove_roles(*roles, reason="Reaction roles")
+                except discord.HTTPException as e:
+                    await sendlog(self.get_logchannel(), f"❌ Rollen von {member.name} konnten nicht geändert werden: {e}")
+                    continue
+                self.queue.edits += 1
+                effective += [(role, add) for role in roles]
+            for role, add in effective:
+                line = f"✅ {member.name} hat die Rolle: {role.name} erhalten" if add else f"❌ {member.name} hat die Rolle: {role.name} verloren"
+                await sendlog(self.get_logchannel(), line)
+                self.channel_lines.append(line)
+
+    @tasks.loop(seconds=1)
+    async def apply_role_changes(self):
+        await self.apply_pending()
+
+    async def flush_digest(self):
+        channel_lines, self.channel_lines = self.channel_lines, []
+        channel = self.bot.get_channel(self.role_channel_id)
+        if channel_lines and channel is not None:
+            for chunk in pack_lines(channel_lines):
+                await channel.send(chunk, delete_after = 12)
+
+    @tasks.loop(seconds=10)
+    async def send_digest(self):
+        try:
+            await self.flush_digest()
+        except discord.HTTPException as e:
+            print(f"[roles] Digest konnte nicht gesendet werden: {e}")
+
+    @apply_role_changes.before_loop
+    @send_digest.before_loop
+    async def before_queue(self):
+        await self.bot.wait_until_ready()
+
+    @commands.command()
+    async def rolecache(self, ctx):
+        """Zeigt Treffer/Fehlgriffe der Rollen-Caches an"""
+        if ctx.channel.id != self.config_channel_id:
+            return
+        stats = self.index.messages.stats()
+        await ctx.send(
+            f"🗂️ Nachrichten: {stats['size']}/{stats['maxsize']} cached, "
+            f"{stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%})\n"
+            f"Members: {self.member_hits} hits, {self.member_misses} misses\n"
+            f"Queue: {len(self.queue)} pending, {self.queue.queued} queued, "
+            f"{self.queue.cancelled} cancelled, {self.queue.edits} edits"
+        )
+
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
 
-        if payload.channel_id != self.config["ROLE_CHANNEL_ID"]:
+        if payload.channel_id != self.role_channel_id:
             return
 
         guild = self.bot.get_guild(payload.guild_id)
         if guild is None:
             return
 
-        logchannel = self.get_logchannel()  # ✅ jetzt ein TextChannel-Objekt
-        if logchannel is None:
+        if self.get_logchannel() is None:
             print("❌ Logchannel nicht gefunden!")
             return
 
-        member = await guild.fetch_member(payload.user_id)
-        if member.bot:
+        member = await self.resolve_member(guild, payload.user_id, payload.member)
+        if member is None or member.bot:
             return
 
         channel = guild.get_channel(payload.channel_id)
-        message = await channel.fetch_message(payload.message_id)
-
-        role_name = message.content.strip()
-        role = discord.utils.get(guild.roles, name=role_name)
+        role_name, role = await self.resolve_role(guild, channel, payload.message_id, payload.emoji)
 
+        if role_name is None:
+            return  # Emoji gehört zu keiner Rolle dieser Nachricht
         if role is None:
-            await sendlog(logchannel, f"❌ {message.author}s Role: {role_name} existiert nicht")
+            await sendlog(self.get_logchannel(), f"❌ Role: {role_name} existiert nicht")
             return
 
-        await member.add_roles(role)
-        await sendlog(logchannel, f"✅ {member.name} hat die Rolle: {role.name} erhalten")
-        await channel.send(f"✅ {member.name} hat die Rolle: {role.name} erhalten",delete_after = 12)
+        self.queue.add(member, role)
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
-        if payload.channel_id != self.config["ROLE_CHANNEL_ID"]:
+        if payload.channel_id != self.role_channel_id:
             return
 
         guild = self.bot.get_guild(payload.guild_id)
         if guild is None:
             return
 
-        logchannel = self.get_logchannel()
-        if logchannel is None:
+        if self.get_logchannel() is None:
             print("❌ Logchannel nicht gefunden!")
             return
 
         channel = guild.get_channel(payload.channel_id)
-        message = await channel.fetch_message(payload.message_id)
-        role_name = message.content.strip()
-        role = discord.utils.get(guild.roles, name=role_name)
-        member = guild.get_member(payload.user_id)
+        role_name, role = await self.resolve_role(guild, channel, payload.message_id, payload.emoji)
+        member = await self.resolve_member(guild, payload.user_id)
 
         if role and member and not member.bot:
-            await member.remove_roles(role)
-            await sendlog(logchannel, f"❌ {member.name} hat die Rolle: {role.name} verloren")
-            await channel.send(f"❌ {member.name} hat die Rolle: {role.name} verloren",delete_after = 12)
+            self.queue.remove(member, role)
 
 
 # Setup-Funktion, damit der Cog geladen werden kann
 async def setup(bot):
 
-    await bot.add_cog(ReactionRoleCog(bot, config))
\ No newline at end of file
+    await bot.add_cog(ReactionRoleCog(bot, config))
@@ -1,25 +1,17 @@
-
-import os
-import json
+from utils.config_store import ConfigError, ConfigStore  # ConfigError is raised by store.update
+from utils.log_sink import log_sink
 
 #------load token from .env file----------------------------------------------------------------------------------------------------------------------------------------
 
 
 
-with open("config.json", "r") as f: 
-    settings = json.load(f)
-
-def load_config():
-    if not os.path.exists("config.json"):
-        with open("config.json", "w") as f:
-            json.dump({}, f, indent=4)
-    with open("config.json", "r") as f:
-        return json.load(f)
+# typed, hot reloadable config; see utils/config_store.py
+store = ConfigStore("config.json")
 
-def save_config(data, filename="config.json"):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+# plain dict view of store.current for existing ``settings.get(...)`` callers, kept in sync on every change
+settings = store.settings
 
 async def sendlog(channel, message: str):
+    # buffered, the log sink sends it together with other lines
     print(message)
-    await channel.send(f"➡️{message}")
+    log_sink.log(f"➡️{message}", channel)
@@ -2,18 +2,21 @@ import discord
 from discord.ext import commands
 import os
 import asyncio
-import logging
 import signal
 from dotenv import load_dotenv
-from config import settings
+from config import settings, store as config_store
+from utils.log_sink import log_sink
+from utils.logging_setup import setup_logging
+from utils.cog_loader import load_cogs
+from utils.lifecycle import Lifecycle
+from utils.message_router import MessageRouter
+from utils.database import open_database
+from utils.persistence import persistence
+from utils.presence import PresenceManager
 
 # ---- Logger setup ----
-logging.basicConfig(
-    filename='discord.log',
-    filemode='w',
-    level=logging.DEBUG,
-    format='%(asctime)s:%(levelname)s:%(name)s: %(message)s'
-)
+# file writes happen on the listener thread, not on the event loop
+log_listener = setup_logging(settings)
 
 # ---- Bot setup ----
 intents = discord.Intents.default()
@@ -24,6 +27,22 @@ intents.reactions = True
 intents.guilds = True
 
 bot = commands.Bot(command_prefix=settings.get("PREFIX", "!"), intents=intents, help_command=None)
+config_store.subscribe("prefix", lambda snapshot: setattr(bot, "command_prefix", snapshot.get("PREFIX", "!")), keys=["PREFIX"])
+# set before connecting, so the presence goes out with IDENTIFY instead of a separate update
+bot.presence = PresenceManager(bot, min_interval=settings.get("PRESENCE_MIN_INTERVAL", 12.0))
+bot.presence.apply_config(config_store.current)
+config_store.subscribe(
+    "presence", bot.presence.apply_config,
+    keys=["STATUS", "ACTIVITY_TYPE", "ACTIVITY", "ACTIVITY_ROTATION", "PRESENCE_ROTATE_INTERVAL"],
+)
+bot.message_router = MessageRouter(bot)
+bot.lifecycle = Lifecycle(bot, min_interval=settings.get("RESYNC_MIN_INTERVAL", 30))
+log_sink.bind(
+    bot,
+    settings.get("LOG_CHANNEL_ID"),
+    interval=settings.get("LOG_FLUSH_INTERVAL", 5.0),
+    max_buffer=settings.get("LOG_MAX_BUFFER", 500),
+)
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
@@ -62,79 +81,77 @@ async def load_or_reload_cog(cog_name: str = None):
     print(f"Loaded: {success}, Reloaded: {reloaded}, Failed: {failed}")
     return {"success": success, "reloaded": reloaded, "failed": failed}
 
-# ---- Helper to update presence ----
-async def update_presence():
-    # STATUS
-    status_config = settings.get("STATUS", [0, ["online", "idle", "dnd", "offline"]])
-    status_index = status_config[0] if isinstance(status_config, list) and len(status_config) == 2 else 0
-    status_list = status_config[1] if isinstance(status_config, list) and len(status_config) == 2 else ["online"]
-    status_str = status_list[status_index] if 0 <= status_index < len(status_list) else "online"
-    discord_status = getattr(discord.Status, status_str.lower(), discord.Status.online)
-
-    # ACTIVITY_TYPE
-    type_config = settings.get("ACTIVITY_TYPE", [0, ["playing"]])
-    type_index = type_config[0] if isinstance(type_config, list) and len(type_config) == 2 else 0
-    type_list = type_config[1] if isinstance(type_config, list) and len(type_config) == 2 else ["playing"]
-    type_str = type_list[type_index] if 0 <= type_index < len(type_list) else "playing"
-    type_enum_map = {
-        "playing": discord.ActivityType.playing,
-        "listening": discord.ActivityType.listening,
-        "watching": discord.ActivityType.watching,
-        "streaming": discord.ActivityType.streaming,
-        "competing": discord.ActivityType.competing
-    }
-    activity_type_enum = type_enum_map.get(type_str.lower(), discord.ActivityType.playing)
-
-    # ACTIVITY string
-    activity_name = settings.get("ACTIVITY", "!help")
-    if not isinstance(activity_name, str) or not activity_name:
-        activity_name = "!help"
-
-    activity = discord.Activity(type=activity_type_enum, name=activity_name)
-
-    await bot.change_presence(status=discord_status, activity=activity)
+# ---- Startup: cogs are loaded before the gateway connects ----
+async def setup_hook():
+    bot.startup_report = await load_cogs(bot)
+    # picks up hand edits of config.json without a restart
+    bot.config_watcher = asyncio.create_task(config_store.watch(settings.get("CONFIG_POLL_INTERVAL", 5.0)))
 
+bot.setup_hook = setup_hook
+bot.startup_report = None
 
-# ---- Bot events ----
-@bot.event
-async def on_ready():
+def startup_embed(results):
+    embed = discord.Embed(
+        title="💟 Bot Ready",
+        color=discord.Color.green() if not results["failed"] else discord.Color.orange(),
+        timestamp=discord.utils.utcnow()
+    )
+    if results["success"]:
+        lines = [
+            f"{name} — load {results['timings'][name] * 1000:.0f} ms"
+            for name in results["success"]
+        ]
+        embed.add_field(name=f"✅ Loaded ({len(results['success'])})", value="\n".join(lines)[:1024], inline=False)
+    if results["failed"]:
+        embed.add_field(name=f"❌ Failed ({len(results['failed'])})", value="\n".join(results["failed"])[:1024], inline=False)
+    total = len(results["success"]) + len(results["failed"])
+    embed.set_footer(
+        text=f"Total cogs processed: {total} in {results['total'] * 1000:.0f} ms "
+        f"(shared imports {results['imports'] * 1000:.0f} ms)"
+    )
+    return embed
+
+# ---- Lifecycle: full startup once, cheap resync on reconnects ----
+async def startup():
     await asyncio.sleep(1)
-    LOG_CHANNEL = bot.get_channel(settings.get("LOG_CHANNEL_ID"))
     print(f"✅ Logged in as {bot.user} (ID: {bot.user.id})")
 
-    if LOG_CHANNEL:
-        await LOG_CHANNEL.send("####----Bot restarted----####")
-        await LOG_CHANNEL.send(f"✅ Logged in as {bot.user} (ID: {bot.user.id})")
-        await LOG_CHANNEL.send("------")
+    log_sink.log("####----Bot restarted----####")
+    log_sink.log(f"✅ Logged in as {bot.user} (ID: {bot.user.id})")
+    log_sink.log("------")
 
-    # ---- Set bot presence from STATUS, ACTIVITY_TYPE, and ACTIVITY ----
-    try:
-        await update_presence()
-    except Exception as e:
-        print(f"⚠️ Failed to set presence on startup: {e}")
-        await bot.change_presence(status=discord.Status.dnd, activity=discord.Game(name="presenceerror"))
-
-    # ---- Load/reload cogs ----
-    results = await load_or_reload_cog()
-
-    if LOG_CHANNEL:
-        embed = discord.Embed(
-            title="💟 Bot Ready",
-            color=discord.Color.green() if not results["failed"] else discord.Color.orange(),
-            timestamp=discord.utils.utcnow()
-        )
-        if results["success"]:
-            embed.add_field(name=f"✅ Loaded ({len(results['success'])})", value="\n".join(results["success"]), inline=True)
-        if results["reloaded"]:
-            embed.add_field(name=f"⚠️ Reloaded ({len(results['reloaded'])})", value="\n".join(results["reloaded"]), inline=True)
-        if results["failed"]:
-            embed.add_field(name=f"❌ Failed ({len(results['failed'])})", value="\n".join(results["failed"]), inline=False)
-        total = len(results["success"]) + len(results["reloaded"]) + len(results["failed"])
-        embed.set_footer(text=f"Total cogs processed: {total}")
-        await LOG_CHANNEL.send(embed=embed)
+    # ---- Presence from STATUS, ACTIVITY_TYPE and ACTIVITY already came with IDENTIFY ----
+    bot.presence.identified()
+    bot.presence.start()
+
+    # ---- Report the cog load from setup_hook ----
+    if bot.startup_report is not None:
+        log_sink.log_embed(startup_embed(bot.startup_report))
+        bot.startup_report = None
 
     print("💟 BOT IS READY")
 
+async def reconnected():
+    # the new session was identified with bot.status/bot.activity, nothing to send
+    bot.presence.identified()
+    print(f"🔄 Reconnected (connection #{bot.lifecycle.connects}), state resynced")
+    log_sink.log(f"🔄 Reconnected (connection #{bot.lifecycle.connects}), state resynced")
+
+bot.lifecycle.on_startup("main", startup)
+bot.lifecycle.on_reconnect("main", reconnected)
+
+# ---- Bot events ----
+@bot.event
+async def on_ready():
+    # fires again after every reconnect, the lifecycle decides what actually runs
+    await bot.lifecycle.handle_ready()
+
+@bot.event
+async def on_message(message):
+    # cogs subscribe to bot.message_router instead of adding their own on_message listeners
+    await bot.message_router.dispatch(message)
+    await bot.process_commands(message)
+
 # ---- Reload command (admin-safe) ----
 @bot.command(name="reload")
 async def reload_cog(ctx, cog_name: str = None):
@@ -169,9 +186,8 @@ async def reload_cog(ctx, cog_name: str = None):
     total = len(results["success"]) + len(results["reloaded"]) + len(results["failed"])
     embed.set_footer(text=f"Total cogs processed: {total}")
 
-    LOG_CHANNEL = bot.get_channel(settings.get("LOG_CHANNEL_ID"))
-    if LOG_CHANNEL and LOG_CHANNEL.id != ctx.channel.id:
-        await LOG_CHANNEL.send(embed=embed)
+    if ctx.channel.id != settings.get("LOG_CHANNEL_ID"):
+        log_sink.log_embed(embed)
     await ctx.send(embed=embed)
 
 # ---- Shutdown command (admin-safe) ----
@@ -186,12 +202,10 @@ async def shutdown(ctx):
         await ctx.send("❌ You do not have permission to run this command.")
         return
 
-    LOG_CHANNEL = bot.get_channel(settings.get("LOG_CHANNEL_ID"))
-    if LOG_CHANNEL:
-        await LOG_CHANNEL.send("####----Bot is shutting down----####")
-        await LOG_CHANNEL.send(f"🛑 Shutdown initiated by: {ctx.author}")
+    log_sink.log("####----Bot is shutting down----####")
+    log_sink.log(f"🛑 Shutdown initiated by: {ctx.author}")
     await ctx.send("Bot is shutting down safely...")
-    await bot.close()
+    await close_bot()
 
 # ---- Friendly error handler ----
 @bot.event
@@ -202,12 +216,15 @@ async def on_command_error(ctx, error):
         raise error
 
 # ---- Signal handling for safe shutdown ----
+async def close_bot():
+    # send buffered log lines while the connection is still open
+    await log_sink.flush()
+    await bot.close()
+
 def handle_exit(*args):
-    LOG_CHANNEL = bot.get_channel(settings.get("LOG_CHANNEL_ID"))
-    if LOG_CHANNEL:
-        asyncio.create_task(LOG_CHANNEL.send("⚡ Bot is shutting down due to termination signal."))
+    log_sink.log("⚡ Bot is shutting down due to termination signal.")
     print("💀 Bot terminated via signal.")
-    asyncio.create_task(bot.close())
+    asyncio.create_task(close_bot())
 
 signal.signal(signal.SIGINT, handle_exit)
 signal.signal(signal.SIGTERM, handle_exit)
@@ -215,6 +232,10 @@ signal.signal(signal.SIGTERM, handle_exit)
 # ---- Bot start ----
 async def main():
     async with bot:
+        # schema and first-run import on the database writer thread, before any cog uses it
+        await open_database()
         await bot.start(TOKEN)
+    await persistence.flush()
+    log_listener.stop()
 
 asyncio.run(main())
@@ -0,0 +1,22 @@
+from utils.triggers import Trigger, TriggerMatcher
+
+
+def test_duplicate_group_names_do_not_break_the_matcher():
+    matcher = TriggerMatcher([
+        Trigger(r"(?P<w>foo)", "first", regex=True),
+        Trigger(r"(?P<w>bar)", "second", regex=True),
+        Trigger("baz", "plain"),
+    ])
+    assert len(matcher) == 1
+    assert matcher.match(1, "foo bar baz").response == "plain"
+
+
+def test_backreferences_are_rejected_instead_of_misrouted():
+    matcher = TriggerMatcher([
+        Trigger("x", "plain"),
+        Trigger(r"(a)\1", "double a", regex=True),
+        Trigger(r"(?:b)+", "non-capturing", regex=True),
+    ])
+    assert [t.response for t in matcher.triggers] == ["plain", "non-capturing"]
+    assert matcher.match(1, "aa") is None
+    assert matcher.match(1, "bbb").response == "non-capturing"
@@ -0,0 +1,41 @@
+import asyncio
+import os
+
+from cogs.activity_tracker_v2 import ActivityTracker
+from utils.persistence import persistence
+from utils.snapshots import write_snapshot
+
+
+def make_tracker(directory):
+    # only the weekly baseline state, no bot needed
+    tracker = object.__new__(ActivityTracker)
+    tracker.backup_dir = os.path.join(directory, "weekly_backup")
+    tracker.baseline_file = os.path.join(directory, "weekly_backup_total.json")
+    tracker.baseline = None
+    tracker._weekly_ranks_count = None
+    os.makedirs(tracker.backup_dir, exist_ok=True)
+    return tracker
+
+
+def week(main, voice):
+    return {"1": {"Game": {"main": main, "duplicate": 0}}}, {"1": {"total": voice}}
+
+
+def test_new_week_after_restart_is_counted_once(tmp_path):
+    tracker = make_tracker(str(tmp_path))
+    write_snapshot(os.path.join(tracker.backup_dir, "weekly_data_1_01_01_2026.wsnap"), *week(10, 5))
+    write_snapshot(os.path.join(tracker.backup_dir, "weekly_data_2_08_01_2026.wsnap"), *week(20, 7))
+
+    async def run():
+        # cold baseline: nothing in memory and no baseline file, like right after a restart
+        await tracker._write_week(os.path.join(tracker.backup_dir, "weekly_data_3_15_01_2026.wsnap"), *week(30, 11))
+        await persistence.flush()
+
+    asyncio.run(run())
+
+    rebuilt, count = tracker._combine_backups()
+    assert count == 3
+    assert tracker.baseline["_backup_count"] == 3
+    assert tracker.baseline["activity_times"]["1"]["Game"]["main"] == 60
+    assert tracker.baseline["voice_times"]["1"]["total"] == 23
+    assert ActivityTracker._count_baseline_differences(tracker.baseline, rebuilt) == 0
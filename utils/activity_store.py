@@ -0,0 +1,208 @@
+import json
+import os
+import time
+
+from utils.persistence import persistence, write_text_atomic
+
+
+def _read_snapshot(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}, {}, 0
+    return data.get("activity_times", {}), data.get("voice_times", {}), data.get("_seq", 0)
+
+
+class JsonFileBackend:
+    """Original storage: the whole state is rewritten on every save."""
+
+    def __init__(self, path):
+        self.path = path
+
+    async def load(self):
+        activity_times, voice_times, _ = await persistence.run(_read_snapshot, self.path)
+        return activity_times, voice_times
+
+    def record(self, user_id, act_name, field, elapsed):
+        pass  # everything is picked up by the next full save
+
+    def save(self, activity_times, voice_times):
+        persistence.mark_dirty(
+            self.path,
+            lambda: json.dumps({"activity_times": activity_times, "voice_times": voice_times}, indent=4),
+            lambda text: write_text_atomic(self.path, text),
+        )
+
+    def reset(self, activity_times, voice_times):
+        self.save(activity_times, voice_times)
+
+    async def close(self, activity_times, voice_times):
+        self.save(activity_times, voice_times)
+        await persistence.flush()
+
+
+class JournalBackend:
+    """Snapshot + append-only journal of settled session time.
+
+    Every settle appends one compact ``[seq, user_id, act_name, field, seconds]``
+    line, so a save only costs as much as what changed since the last one. The
+    journal is folded into the snapshot every ``compact_every`` records or
+    ``compact_interval`` seconds. The snapshot stores the last sequence number
+    it contains, so a crash between writing the snapshot and truncating the
+    journal can't count anything twice.
+    """
+
+    def __init__(self, snapshot_path, journal_path=None, compact_every=5000, compact_interval=3600):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + ".journal"
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+
+        self.seq = 0
+        self._pending = []
+        self._compact_state = None  # (activity_times, voice_times) once a compaction is due
+        self._journal_records = 0
+        self._last_compact = time.monotonic()
+
+    async def load(self):
+        return await persistence.run(self.load_sync)
+
+    def load_sync(self):
+        activity_times, voice_times, self.seq = _read_snapshot(self.snapshot_path)
+        replayed = 0
+        torn = False
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        seq, user_id, act_name, field, elapsed = json.loads(line)
+                    except (ValueError, TypeError):
+                        torn = True  # crash mid-append
+                        continue
+                    if seq <= self.seq:
+                        continue
+                    self._apply(activity_times, voice_times, user_id, act_name, field, elapsed)
+                    self.seq = seq
+                    replayed += 1
+        except FileNotFoundError:
+            pass
+        # a torn line would swallow the next append, so fold into a fresh snapshot first
+        self._journal_records = self.compact_every if torn else replayed
+        if replayed:
+            print(f"[activity] Replayed {replayed} journal records")
+        return activity_times, voice_times
+
+    @staticmethod
+    def _apply(activity_times, voice_times, user_id, act_name, field, elapsed):
+        if act_name is None:
+            entry = voice_times.setdefault(user_id, {"total": 0, "ongoing_start": None})
+        else:
+            entry = activity_times.setdefault(user_id, {}).setdefault(
+                act_name, {"main": 0, "duplicate": 0, "ongoing_start": None}
+            )
+        entry[field] = entry.get(field, 0) + elapsed
+
+    def record(self, user_id, act_name, field, elapsed):
+        self.seq += 1
+        self._pending.append(json.dumps([self.seq, user_id, act_name, field, elapsed], separators=(",", ":")))
+
+    # Appends and compactions share one persistence key, so they never overlap
+    # and a compaction can't truncate records that were appended after it.
+    def _prepare_write(self):
+        if self._compact_state is not None:
+            activity_times, voice_times = self._compact_state
+            self._compact_state = None
+            self._pending = []  # already contained in the in-memory state
+            self._journal_records = 0
+            self._last_compact = time.monotonic()
+            return "compact", json.dumps(
+                {"_seq": self.seq, "activity_times": activity_times, "voice_times": voice_times},
+                separators=(",", ":"),
+            )
+        lines, self._pending = self._pending, []
+        self._journal_records += len(lines)
+        return "append", "".join(line + "\n" for line in lines)
+
+    def _write(self, job):
+        kind, text = job
+        if kind == "compact":
+            write_text_atomic(self.snapshot_path, text)
+            with open(self.journal_path, "w", encoding="utf-8"):
+                pass
+        elif text:
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _submit(self):
+        if self._pending or self._compact_state is not None:
+            persistence.mark_dirty(self.snapshot_path, self._prepare_write, self._write)
+
+    def save(self, activity_times, voice_times):
+        if (self._journal_records + len(self._pending) >= self.compact_every
+                or time.monotonic() - self._last_compact >= self.compact_interval):
+            self._compact_state = (activity_times, voice_times)
+        self._submit()
+
+    def reset(self, activity_times, voice_times):
+        self._compact_state = (activity_times, voice_times)
+        self._submit()
+
+    async def close(self, activity_times, voice_times):
+        self._submit()
+        await persistence.flush()
+
+
+class SqliteBackend:
+    """Stores activity in the shared SQLite database.
+
+    Settled time is summed into per-(user, activity) deltas and handed to the
+    database writer thread on save, so the event loop never touches the disk.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._activity_deltas = {}  # (user_id, act_name) -> [main, duplicate]
+        self._voice_deltas = {}     # user_id -> seconds
+
+    async def load(self):
+        return await self.db.load_activity()
+
+    def record(self, user_id, act_name, field, elapsed):
+        if act_name is None:
+            self._voice_deltas[user_id] = self._voice_deltas.get(user_id, 0) + elapsed
+            return
+        delta = self._activity_deltas.setdefault((user_id, act_name), [0, 0])
+        delta[0 if field == "main" else 1] += elapsed
+
+    def save(self, activity_times, voice_times):
+        if not self._activity_deltas and not self._voice_deltas:
+            return
+        activity_deltas, voice_deltas = self._activity_deltas, self._voice_deltas
+        self._activity_deltas, self._voice_deltas = {}, {}
+        self.db.submit_write(self.db.apply_activity_deltas, activity_deltas, voice_deltas)
+
+    def reset(self, activity_times, voice_times):
+        self._activity_deltas, self._voice_deltas = {}, {}
+        self.db.submit_write(self.db.reset_activity)
+
+    async def close(self, activity_times, voice_times):
+        # awaited, not submitted: a reloaded cog must read totals that include these deltas;
+        # the writer runs in order, so every earlier save has committed too
+        activity_deltas, voice_deltas = self._activity_deltas, self._voice_deltas
+        self._activity_deltas, self._voice_deltas = {}, {}
+        await self.db.write(self.db.apply_activity_deltas, activity_deltas, voice_deltas)
+
+
+def make_backend(kind, data_file, compact_every=5000, compact_interval=3600):
+    """Build the storage backend selected by ``ACTIVITY_STORAGE`` in config.json."""
+    if kind == "sqlite":
+        from utils.database import get_database
+        return SqliteBackend(get_database())
+    if kind == "json":
+        return JsonFileBackend(data_file)
+    if kind == "journal":
+        return JournalBackend(data_file, compact_every=compact_every, compact_interval=compact_interval)
+    raise ValueError(f"Unknown activity storage backend: {kind}")
@@ -0,0 +1,284 @@
+"""Deduplicating backups of the bot's data files, database and in-memory state.
+
+Layout of the backup directory::
+
+    objects/ab/ab12....gz       one gzip file per distinct content, named by its sha256
+    manifests/<timestamp>.json  {"created": ..., "files": {name: {"sha256": ..., "size": ...}}}
+
+Every source is hashed while it is read and only contents that are not in
+``objects/`` yet get compressed, so unchanged files (old weekly snapshots, a
+config nobody touched) cost one read and no space. Files are streamed
+straight into their object, nothing is copied to a temp folder first. The
+database is copied with SQLite's backup API into a temporary file next to
+the objects, a consistent snapshot taken while the writer thread keeps
+going, and then hashed and stored in chunks like any other file.
+
+Restore a backup into a directory with::
+
+    python -m utils.backup restore backups/manifests/<timestamp>.json <directory>
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from utils.persistence import persistence, write_json_atomic
+
+CHUNK_SIZE = 1 << 20
+TIMESTAMP = "%Y-%m-%d_%H-%M-%S"
+
+
+def snapshot_database(conn, path):
+    """Consistent copy of the database behind ``conn`` written to ``path`` (reader thread)."""
+    dest = sqlite3.connect(path)
+    try:
+        conn.backup(dest)
+    finally:
+        dest.close()
+
+
+def collect_sources(base_dir):
+    """``[(name in the backup, path)]`` of the data files under ``base_dir``."""
+    sources = []
+    for folder, suffixes in (("", (".json", ".journal")), ("cogs", (".json",)), ("weekly_backup", None)):
+        directory = os.path.join(base_dir, folder)
+        if not os.path.isdir(directory):
+            continue
+        for file in sorted(os.listdir(directory)):
+            path = os.path.join(directory, file)
+            if os.path.isfile(path) and (suffixes is None or file.endswith(suffixes)):
+                sources.append((f"{folder}/{file}" if folder else file, path))
+    return sources
+
+
+class BackupStore:
+    """Content addressed object store plus one manifest per backup. Blocking, worker threads only."""
+
+    def __init__(self, root):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        self.manifests = os.path.join(root, "manifests")
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], f"{digest}.gz")
+
+    def _put(self, digest, chunks):
+        """Store the content under ``digest`` unless it is there already; returns the bytes written."""
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+                for chunk in chunks():
+                    gz.write(chunk)
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def add_file(self, path):
+        """Hash ``path`` and store it if new; returns ``(entry, bytes written)``."""
+        with open(path, "rb") as f:
+            digest, size = hashlib.sha256(), 0
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+            digest = digest.hexdigest()
+
+            # the same open file for both passes: an atomic replace in between can't mix two versions
+            def chunks():
+                f.seek(0)
+                remaining = size
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+
+            written = self._put(digest, chunks)
+        return {"sha256": digest, "size": size}, written
+
+    def add_bytes(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        view = memoryview(data)
+        written = self._put(digest, lambda: (view[i:i + CHUNK_SIZE] for i in range(0, len(view), CHUNK_SIZE)))
+        return {"sha256": digest, "size": len(data)}, written
+
+    def create(self, sources, blobs, now=None):
+        """Back up ``sources`` (``[(name, path)]``) and ``blobs`` (``{name: bytes}``); returns a summary."""
+        now = now or datetime.now()
+        files, new, written = {}, 0, 0
+        for name, path in sources:
+            try:
+                files[name], size = self.add_file(path)
+            except FileNotFoundError:
+                continue  # removed since it was listed
+            new += size > 0
+            written += size
+        for name, data in blobs.items():
+            files[name], size = self.add_bytes(data)
+            new += size > 0
+            written += size
+
+        os.makedirs(self.manifests, exist_ok=True)
+        name = now.strftime(TIMESTAMP)
+        write_json_atomic(
+            os.path.join(self.manifests, f"{name}.json"),
+            {"created": now.isoformat(timespec="seconds"), "files": files},
+            indent=1,
+        )
+        return {
+            "name": name,
+            "files": len(files),
+            "new": new,
+            "reused": len(files) - new,
+            "size": sum(entry["size"] for entry in files.values()),
+            "written": written,
+        }
+
+    # -------------------- Listing / restore --------------------
+    def list(self):
+        if not os.path.isdir(self.manifests):
+            return []
+        return sorted(f[:-5] for f in os.listdir(self.manifests) if f.endswith(".json"))
+
+    def load_manifest(self, name):
+        with open(os.path.join(self.manifests, f"{name}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def restore(self, manifest, directory):
+        """Write every file of ``manifest`` below ``directory``; returns the number of files."""
+        for name, entry in manifest["files"].items():
+            dest = os.path.join(directory, *name.split("/"))
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            with gzip.open(self._object_path(entry["sha256"]), "rb") as src, open(dest, "wb") as out:
+                shutil.copyfileobj(src, out, CHUNK_SIZE)
+        return len(manifest["files"])
+
+    # -------------------- Retention --------------------
+    def prune(self, keep_last=7, keep_daily=14, keep_weekly=8):
+        """Drop backups outside the policy, then objects no manifest uses; returns ``(backups, objects)`` removed.
+
+        Kept are the newest ``keep_last`` backups, the newest backup of each of
+        the last ``keep_daily`` days and of each of the last ``keep_weekly`` weeks.
+        """
+        names = self.list()
+        keep = set(names[-keep_last:]) if keep_last else set()
+        for count, period in ((keep_daily, lambda d: d.date()), (keep_weekly, lambda d: d.isocalendar()[:2])):
+            seen = set()
+            for name in reversed(names):
+                key = period(datetime.strptime(name, TIMESTAMP))
+                if key in seen:
+                    continue
+                if len(seen) == count:
+                    break
+                seen.add(key)
+                keep.add(name)
+
+        removed = [name for name in names if name not in keep]
+        for name in removed:
+            os.remove(os.path.join(self.manifests, f"{name}.json"))
+
+        used = {entry["sha256"] for name in keep for entry in self.load_manifest(name)["files"].values()}
+        objects = 0
+        if os.path.isdir(self.objects):
+            for folder in os.listdir(self.objects):
+                for file in os.listdir(os.path.join(self.objects, folder)):
+                    if file.endswith(".tmp") or file.split(".")[0] not in used:
+                        os.remove(os.path.join(self.objects, folder, file))
+                        objects += 1
+        return len(removed), objects
+
+
+class BackupService:
+    """Takes backups without blocking the event loop.
+
+    Cogs add in-memory state with ``register(name, snapshot)``. ``snapshot()``
+    runs on the event loop right before the backup starts and returns str or
+    bytes, so the state it captures is consistent. Hashing, compressing and
+    pruning run on a dedicated worker thread; runs never overlap.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.providers = {}  # name -> snapshot()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backup")
+        self._lock = asyncio.Lock()
+        self.last = None
+
+    def register(self, name, snapshot):
+        self.providers[name] = snapshot
+
+    def unregister(self, name):
+        self.providers.pop(name, None)
+
+    def store(self, settings):
+        return BackupStore(os.path.join(self.base_dir, settings.get("BACKUP_DIR", "backups")))
+
+    async def run(self, settings):
+        """Take a backup and apply the retention policy; returns the summary of ``BackupStore.create``."""
+        from utils.database import get_database
+
+        async with self._lock:
+            start = time.perf_counter()
+            await persistence.flush()  # pending JSON writes belong in this backup
+            blobs = {}
+            for name, snapshot in list(self.providers.items()):
+                try:
+                    data = snapshot()
+                except Exception as e:
+                    print(f"[backup] Snapshot of {name} failed: {e!r}")
+                    continue
+                blobs[name] = data.encode("utf-8") if isinstance(data, str) else data
+
+            store = self.store(settings)
+            db = get_database()
+            os.makedirs(store.root, exist_ok=True)
+            db_copy = os.path.join(store.root, "database.tmp")
+            loop = asyncio.get_running_loop()
+            try:
+                await db.read(snapshot_database, db_copy)
+                sources = collect_sources(self.base_dir) + [(os.path.basename(db.path), db_copy)]
+                summary = await loop.run_in_executor(self._executor, store.create, sources, blobs)
+            finally:
+                if os.path.exists(db_copy):
+                    os.remove(db_copy)
+            summary["pruned"] = await loop.run_in_executor(
+                self._executor, store.prune,
+                settings.get("BACKUP_KEEP_LAST", 7),
+                settings.get("BACKUP_KEEP_DAILY", 14),
+                settings.get("BACKUP_KEEP_WEEKLY", 8),
+            )
+            summary["seconds"] = time.perf_counter() - start
+            self.last = summary
+            print(
+                f"[backup] {summary['name']}: {summary['files']} files, {summary['new']} new, "
+                f"{summary['written'] / 1024:.0f} KiB written in {summary['seconds']:.1f}s"
+            )
+            return summary
+
+
+backups = BackupService(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backup tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    restore = sub.add_parser("restore", help="restore a backup manifest into a directory")
+    restore.add_argument("manifest")
+    restore.add_argument("directory")
+    args = parser.parse_args()
+
+    manifest_path = os.path.abspath(args.manifest)
+    store = BackupStore(os.path.dirname(os.path.dirname(manifest_path)))
+    with open(manifest_path, encoding="utf-8") as f:
+        count = store.restore(json.load(f), args.directory)
+    print(f"Restored {count} file(s) to {args.directory}")
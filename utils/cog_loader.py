@@ -0,0 +1,120 @@
+"""Startup loader for the extensions in ``cogs/``.
+
+Loading happens in two phases:
+
+1. Every cog file is parsed (no code runs) for its imports and an optional
+   module-level ``DEPENDENCIES = ["other_cog", ...]`` list. The non-cog
+   modules it imports (discord, pytz, utils.* ...) are then imported on a
+   thread pool, concurrently for all cogs. Modules shared between cogs are
+   imported once, so this phase is timed as a whole and not per cog.
+2. The cogs are loaded with ``bot.load_extension`` in dependency order. Their
+   imports are already in ``sys.modules`` at that point, so the per-cog load
+   time is mostly the cog module itself and its ``setup``.
+"""
+import ast
+import asyncio
+import importlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def discover(directory="cogs"):
+    return sorted(f[:-3] for f in os.listdir(directory) if f.endswith(".py") and f != "__init__.py")
+
+
+def inspect_cog(directory, name):
+    """Return ``(imported module names, declared dependencies)`` without executing the file."""
+    with open(os.path.join(directory, f"{name}.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=f"{name}.py")
+    imports, dependencies = [], []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imports.append(node.module)
+        elif isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "DEPENDENCIES" for t in node.targets):
+            dependencies = list(ast.literal_eval(node.value))
+    return [m for m in imports if not m.startswith(directory + ".")], dependencies
+
+
+def _warm_imports(modules):
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception:
+            pass  # load_extension reports the real error
+
+
+def dependency_order(dependencies):
+    """Order cog names so dependencies come first; returns ``(order, {name: reason})`` for the rest."""
+    failed = {}
+    for name, deps in dependencies.items():
+        missing = [d for d in deps if d not in dependencies]
+        if missing:
+            failed[name] = f"missing dependency {', '.join(missing)}"
+
+    order, done = [], set()
+    remaining = [n for n in sorted(dependencies) if n not in failed]
+    while remaining:
+        ready = [n for n in remaining if all(d in done for d in dependencies[n])]
+        if not ready:
+            # the rest waits on a cycle or on a cog that failed
+            for name in remaining:
+                failed[name] = "dependency cycle or failed dependency"
+            break
+        for name in ready:
+            order.append(name)
+            done.add(name)
+        remaining = [n for n in remaining if n not in done]
+    return order, failed
+
+
+async def load_cogs(bot, directory="cogs", workers=4):
+    """Load every cog in ``directory``; returns ``{"success", "failed", "imports", "timings", "total"}``.
+
+    ``imports`` is the wall time of the shared import phase, ``timings`` maps
+    a cog name to its ``load_extension`` seconds.
+    """
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    names = discover(directory)
+
+    imports, dependencies, failed = {}, {}, {}
+    for name in names:
+        try:
+            imports[name], dependencies[name] = inspect_cog(directory, name)
+        except (SyntaxError, ValueError) as e:
+            failed[name] = f"{type(e).__name__}: {e}"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cog-import") as pool:
+        await asyncio.gather(*(loop.run_in_executor(pool, _warm_imports, modules) for modules in imports.values()))
+    import_time = time.perf_counter() - start
+
+    order, unresolved = dependency_order(dependencies)
+    failed.update(unresolved)
+
+    success, timings = [], {}
+    for name in order:
+        if any(d in failed for d in dependencies[name]):
+            failed[name] = "dependency failed to load"
+            continue
+        start = time.perf_counter()
+        try:
+            await bot.load_extension(f"{directory}.{name}")
+        except Exception as e:
+            failed[name] = str(e)
+            continue
+        timings[name] = time.perf_counter() - start
+        success.append(name)
+
+    total = time.perf_counter() - started
+    print(f"Loaded: {success}, Failed: {list(failed)} in {total * 1000:.0f} ms")
+    return {
+        "success": success,
+        "failed": [f"{name}: {reason}" for name, reason in failed.items()],
+        "imports": import_time,
+        "timings": timings,
+        "total": total,
+    }
@@ -0,0 +1,240 @@
+"""Typed, hot reloadable view of config.json.
+
+``ConfigStore.current`` is an immutable ``ConfigSnapshot``: lists are frozen
+to tuples and values that are needed per event are precomputed once per
+change (the lowercased activity blacklist). Changes
+go through ``update()``, are validated against ``SCHEMA`` first and only
+then replace the snapshot, get saved and reach the subscribers. Cogs
+``subscribe(name, callback, keys)`` and copy what they need into attributes
+instead of looking it up on every message.
+
+``watch()`` polls the file's mtime and reloads it when someone edited it
+by hand, once the mtime has stopped changing for one poll interval.
+"""
+import asyncio
+import json
+import os
+from types import MappingProxyType
+from collections.abc import Mapping
+
+
+class ConfigError(ValueError):
+    """Raised with every problem found when a config fails validation."""
+
+    def __init__(self, problems):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+# -------------------- Schema --------------------
+def _choice(value):
+    # [selected index, [options...]] as used by STATUS and ACTIVITY_TYPE
+    if len(value) != 2 or not isinstance(value[0], int) or not isinstance(value[1], (list, tuple)):
+        return "must be [index, [options...]]"
+    if not 0 <= value[0] < len(value[1]):
+        return f"index must be between 0 and {len(value[1]) - 1}"
+
+
+def _strings(value):
+    if not all(isinstance(v, str) for v in value):
+        return "must only contain strings"
+
+
+def _positive(value):
+    if value <= 0:
+        return "must be greater than 0"
+
+
+def _not_empty(value):
+    if not value:
+        return "must not be empty"
+
+
+# key -> (allowed types, extra check or None); keys ending in _ID must be ints, unknown keys pass
+SCHEMA = {
+    "PREFIX": (str, _not_empty),
+    "ACTIVITY": (str, None),
+    "STATUS": ((list, tuple), _choice),
+    "ACTIVITY_TYPE": ((list, tuple), _choice),
+    "activity_blacklist": ((list, tuple), _strings),
+    "leaderboard_limit": (int, _positive),
+    "trigger_word": (str, None),
+    "TRIGGER_MESSAGE": (str, None),
+    "TRIGGERS": ((list, tuple), None),
+    "BIRTHDAY_MESSAGE": (str, None),
+}
+
+
+def validate(data, schema=SCHEMA):
+    """Raise ``ConfigError`` listing every key of ``data`` that breaks ``schema``."""
+    if not isinstance(data, Mapping):
+        raise ConfigError(["config must be a JSON object"])
+    problems = []
+    for key, value in data.items():
+        types, check = schema.get(key, (int, None) if key.endswith("_ID") else (object, None))
+        if isinstance(value, bool) and types is int or not isinstance(value, types):
+            names = types.__name__ if isinstance(types, type) else "/".join(t.__name__ for t in types)
+            problems.append(f"{key} must be {names}, got {type(value).__name__}")
+            continue
+        message = check(value) if check else None
+        if message:
+            problems.append(f"{key} {message}")
+    if problems:
+        raise ConfigError(problems)
+
+
+# -------------------- Snapshots --------------------
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    return value
+
+
+class ConfigSnapshot(Mapping):
+    """One immutable version of the config plus values derived from it."""
+
+    __slots__ = ("_data", "version", "blacklist")
+
+    def __init__(self, data, version):
+        self._data = {key: _freeze(value) for key, value in data.items()}
+        self.version = version
+        self.blacklist = frozenset(a.lower() for a in data.get("activity_blacklist", []))
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def thaw(self):
+        """Plain, mutable deep copy (for JSON and for editing)."""
+        return {key: _thaw(value) for key, value in self._data.items()}
+
+    def changed(self, other):
+        """Keys whose value differs between this snapshot and ``other``."""
+        return {k for k in self._data.keys() | other._data.keys() if self._data.get(k) != other._data.get(k)}
+
+
+# -------------------- Store --------------------
+class ConfigStore:
+    def __init__(self, path="config.json"):
+        self.path = path
+        # legacy dict for ``from config import settings``, kept equal to the current snapshot
+        self.settings = {}
+        self._subscribers = {}  # name -> (callback, keys or None)
+        self._mtime = None
+        self._seen_mtime = None
+        self.reloads = 0
+        self.current = ConfigSnapshot({}, 0)
+        self._apply(self._read(), notify=False)
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({}, f, indent=4)
+        self._mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        validate(data)
+        return data
+
+    def _apply(self, data, notify=True):
+        old, new = self.current, ConfigSnapshot(data, self.current.version + 1)
+        self.current = new
+        self.settings.clear()
+        self.settings.update(new.thaw())
+        if notify:
+            self._notify(old, new)
+        return new
+
+    # -------------------- Subscriptions --------------------
+    def subscribe(self, name, callback, keys=None):
+        """Call ``callback(snapshot)`` after every change touching ``keys`` (None = any key)."""
+        self._subscribers[name] = (callback, None if keys is None else frozenset(keys))
+
+    def unsubscribe(self, name):
+        self._subscribers.pop(name, None)
+
+    def _notify(self, old, new):
+        changed = new.changed(old)
+        if not changed:
+            return
+        for name, (callback, keys) in list(self._subscribers.items()):
+            if keys is not None and not keys & changed:
+                continue
+            try:
+                callback(new)
+            except Exception as e:
+                print(f"[config] Subscriber {name} failed: {e!r}")
+
+    # -------------------- Changes --------------------
+    def update(self, changes=None, remove=()):
+        """Apply ``changes`` (and drop the keys in ``remove``); raises ``ConfigError`` and keeps the old config if invalid."""
+        data = self.current.thaw()
+        data.update(changes or {})
+        for key in remove:
+            data.pop(key, None)
+        return self.replace(data)
+
+    def replace(self, data):
+        validate(data)
+        snapshot = self._apply(json.loads(json.dumps(data)))
+        self._save()
+        return snapshot
+
+    def _save(self):
+        # imported here, utils.persistence is not needed to just read the config
+        from utils.persistence import persistence, write_json_atomic
+
+        def write(data):
+            write_json_atomic(self.path, data, indent=4, ensure_ascii=False)
+            self._mtime = self._seen_mtime = os.stat(self.path).st_mtime_ns
+
+        persistence.mark_dirty(self.path, self.current.thaw, write)
+
+    # -------------------- Hot reload --------------------
+    async def check(self):
+        """Reload the file if its mtime changed and stayed the same since the last check."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        if mtime != self._seen_mtime:
+            self._seen_mtime = mtime  # still being written, maybe; look again next time
+            return False
+
+        try:
+            data = await asyncio.to_thread(self._read)
+        except (ValueError, OSError) as e:
+            self._mtime = mtime  # don't retry until it is edited again
+            print(f"[config] Ignoring invalid {self.path}: {e}")
+            return False
+        if data == self.current.thaw():
+            return False  # our own save
+        self._apply(data)
+        self.reloads += 1
+        print(f"[config] Reloaded {self.path} (version {self.current.version})")
+        return True
+
+    async def watch(self, interval=5.0):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check()
+            except Exception as e:
+                print(f"[config] Watch failed: {e!r}")
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS activity (
+    user_id   INTEGER NOT NULL,
+    activity  TEXT    NOT NULL,
+    main      INTEGER NOT NULL DEFAULT 0,
+    duplicate INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, activity)
+);
+
+CREATE TABLE IF NOT EXISTS voice (
+    user_id INTEGER PRIMARY KEY,
+    total   INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS birthdays (
+    user_id INTEGER PRIMARY KEY,
+    date    TEXT    NOT NULL,
+    greeted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_birthdays_date ON birthdays (date);
+
+CREATE TABLE IF NOT EXISTS state (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS counting_channels (
+    channel_id     INTEGER PRIMARY KEY,
+    guild_id       INTEGER,
+    current_number INTEGER NOT NULL DEFAULT 0,
+    last_user      INTEGER,
+    highscore      INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_counting_channels_guild ON counting_channels (guild_id);
+"""
+
+
+def _report_failure(future):
+    if not future.cancelled() and future.exception():
+        print(f"[database] Background write failed: {future.exception()!r}")
+
+
+class Database:
+    """Shared SQLite store used by all cogs.
+
+    SQLite calls never run on the event loop: writes go through a single
+    writer thread (so they are applied in submission order) and reads through
+    a small pool of reader threads. Every thread owns one connection and the
+    database runs in WAL mode, so readers never wait on the writer.
+    """
+
+    def __init__(self, path, readers=2):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="sqlite-reader")
+        self._opened = False
+
+    # -------------------- Schema --------------------
+    def open_sync(self, import_dir=None):
+        """Create the schema; a brand new file is filled from the legacy JSON files in ``import_dir``."""
+        if self._opened:
+            return
+        is_new = not os.path.exists(self.path)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self._opened = True
+        if is_new and import_dir is not None:
+            from utils.db_import import import_legacy_data
+            import_legacy_data(self, import_dir)
+
+    async def open(self, import_dir=None):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer, self.open_sync, import_dir)
+
+    # -------------------- Connections --------------------
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    # -------------------- Sync primitives (worker threads only) --------------------
+    def write_sync(self, fn, *args):
+        """Run ``fn(conn, *args)`` inside a transaction."""
+        conn = self._connection()
+        with conn:
+            return fn(conn, *args)
+
+    def read_sync(self, fn, *args):
+        return fn(self._connection(), *args)
+
+    # -------------------- Async API --------------------
+    async def write(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, self.write_sync, fn, *args)
+
+    def submit_write(self, fn, *args):
+        """Queue a write without waiting for it (ordering is still preserved)."""
+        future = self._writer.submit(self.write_sync, fn, *args)
+        future.add_done_callback(_report_failure)
+        return future
+
+    async def read(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, self.read_sync, fn, *args)
+
+    async def execute(self, sql, params=()):
+        return await self.write(lambda conn: conn.execute(sql, params).rowcount)
+
+    async def fetchone(self, sql, params=()):
+        return await self.read(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql, params=()):
+        return await self.read(lambda conn: conn.execute(sql, params).fetchall())
+
+    # -------------------- Key/value state --------------------
+    async def get_state(self, key, default=None):
+        row = await self.fetchone("SELECT value FROM state WHERE key = ?", (key,))
+        return json.loads(row[0]) if row else default
+
+    async def set_state(self, key, value):
+        await self.execute(
+            "INSERT INTO state (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value)),
+        )
+
+    # -------------------- Counting game --------------------
+    async def counting_channels(self):
+        return await self.fetchall(
+            "SELECT channel_id, guild_id, current_number, last_user, highscore FROM counting_channels"
+        )
+
+    @staticmethod
+    def save_counting_channels(conn, rows):
+        conn.executemany(
+            "INSERT INTO counting_channels (channel_id, guild_id, current_number, last_user, highscore) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT (channel_id) DO UPDATE SET "
+            "guild_id = excluded.guild_id, current_number = excluded.current_number, "
+            "last_user = excluded.last_user, highscore = excluded.highscore",
+            rows,
+        )
+
+    async def remove_counting_channel(self, channel_id):
+        return await self.execute("DELETE FROM counting_channels WHERE channel_id = ?", (channel_id,)) > 0
+
+    # -------------------- Birthdays --------------------
+    async def birthdays_on(self, date):
+        return await self.fetchall("SELECT user_id, greeted FROM birthdays WHERE date = ?", (date,))
+
+    async def set_birthday(self, user_id, date):
+        await self.execute(
+            "INSERT INTO birthdays (user_id, date, greeted) VALUES (?, ?, 0) "
+            "ON CONFLICT (user_id) DO UPDATE SET date = excluded.date, greeted = 0",
+            (int(user_id), date),
+        )
+
+    async def remove_birthday(self, user_id):
+        return await self.execute("DELETE FROM birthdays WHERE user_id = ?", (int(user_id),)) > 0
+
+    async def mark_greeted(self, user_ids):
+        await self.write(lambda conn: conn.executemany(
+            "UPDATE birthdays SET greeted = 1 WHERE user_id = ?", [(int(u),) for u in user_ids]
+        ))
+
+    async def reset_greeted(self, today):
+        await self.execute("UPDATE birthdays SET greeted = 0 WHERE greeted = 1 AND date != ?", (today,))
+
+    # -------------------- Activity --------------------
+    @staticmethod
+    def read_activity(conn):
+        activity_times, voice_times = {}, {}
+        for user_id, act, main, dup in conn.execute("SELECT user_id, activity, main, duplicate FROM activity"):
+            activity_times.setdefault(str(user_id), {})[act] = {"main": main, "duplicate": dup, "ongoing_start": None}
+        for user_id, total in conn.execute("SELECT user_id, total FROM voice"):
+            voice_times[str(user_id)] = {"total": total, "ongoing_start": None}
+        return activity_times, voice_times
+
+    async def load_activity(self):
+        return await self.read(self.read_activity)
+
+    @staticmethod
+    def apply_activity_deltas(conn, activity_deltas, voice_deltas):
+        conn.executemany(
+            "INSERT INTO activity (user_id, activity, main, duplicate) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (user_id, activity) DO UPDATE SET "
+            "main = main + excluded.main, duplicate = duplicate + excluded.duplicate",
+            [(int(u), act, main, dup) for (u, act), (main, dup) in activity_deltas.items()],
+        )
+        conn.executemany(
+            "INSERT INTO voice (user_id, total) VALUES (?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET total = total + excluded.total",
+            [(int(u), total) for u, total in voice_deltas.items()],
+        )
+
+    @staticmethod
+    def reset_activity(conn):
+        conn.execute("UPDATE activity SET main = 0, duplicate = 0")
+        conn.execute("UPDATE voice SET total = 0")
+
+
+_database = None
+
+
+def get_database():
+    """Return the process-wide database. Nothing touches the file before ``open_database``."""
+    global _database
+    if _database is None:
+        _database = Database(settings.get("DATABASE_FILE", "bot.db"))
+    return _database
+
+
+async def open_database():
+    """Create the schema (and migrate the legacy JSON files into a new file) on the writer thread."""
+    db = get_database()
+    await db.open(import_dir=os.path.dirname(os.path.abspath(db.path)))
+    return db
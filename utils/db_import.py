@@ -0,0 +1,88 @@
+"""Import the old per-cog JSON files into the SQLite database.
+
+Runs automatically the first time the database file is created, or by hand:
+
+    python -m utils.db_import [--db bot.db] [--dir .]
+"""
+import argparse
+import json
+import os
+
+from config import settings
+from utils.activity_store import JournalBackend
+from utils.database import Database
+
+
+def _load_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def counter_row(counter):
+    """Turn the old single-channel counter dict into a counting_channels row."""
+    return (
+        int(counter["channel_id"]), None, counter.get("current_number", 0),
+        counter.get("last_user"), counter.get("highscore", 0),
+    )
+
+
+def import_activity(db, base_dir):
+    # goes through the journal backend so a pending activity_data.journal is included
+    activity_times, voice_times = JournalBackend(os.path.join(base_dir, "activity_data.json")).load_sync()
+    activity_deltas = {
+        (u, act): (v.get("main", 0), v.get("duplicate", 0))
+        for u, acts in activity_times.items() for act, v in acts.items()
+    }
+    voice_deltas = {u: v.get("total", 0) for u, v in voice_times.items()}
+
+    def replace(conn):
+        conn.execute("DELETE FROM activity")
+        conn.execute("DELETE FROM voice")
+        Database.apply_activity_deltas(conn, activity_deltas, voice_deltas)
+
+    db.write_sync(replace)
+    return len(activity_times)
+
+
+def import_birthdays(db, base_dir):
+    birthdays = _load_json(os.path.join(base_dir, "birthdays.json")) or {}
+    db.write_sync(lambda conn: conn.executemany(
+        "INSERT OR REPLACE INTO birthdays (user_id, date, greeted) VALUES (?, ?, ?)",
+        [(int(u), date, int(bool(greeted))) for u, (date, greeted) in birthdays.items()],
+    ))
+    return len(birthdays)
+
+
+def import_counter(db, base_dir):
+    counter = _load_json(os.path.join(base_dir, "counter.json"))
+    if not counter:
+        # a new install starts with the configured channel, once; !stopcount removes it for good
+        counter = {"channel_id": settings.get("COUNTING_GAME_CHANNEL_ID")}
+    if not counter or not counter.get("channel_id"):
+        return 0
+    db.write_sync(Database.save_counting_channels, [counter_row(counter)])
+    return 1
+
+
+def import_legacy_data(db, base_dir="."):
+    results = {
+        "activity users": import_activity(db, base_dir),
+        "birthdays": import_birthdays(db, base_dir),
+        "counter": import_counter(db, base_dir),
+    }
+    print("[database] Imported " + ", ".join(f"{k}: {v}" for k, v in results.items()))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import legacy JSON data into the SQLite database.")
+    parser.add_argument("--db", default="bot.db")
+    parser.add_argument("--dir", default=".")
+    args = parser.parse_args()
+    database = Database(args.db)
+    database.open_sync()
+    import_legacy_data(database, args.dir)
+    database.close()
@@ -0,0 +1,72 @@
+import hashlib
+import re
+import traceback
+
+_ADDRESS = re.compile(r"0x[0-9a-fA-F]+")
+_FRAME = re.compile(r'^\s*File "([^"]+)", line (\d+), in (.+)$')
+
+
+def fingerprint(error, frames=3):
+    """Stable id for "the same error": exception type plus the innermost frames.
+
+    Works on exception objects and on already formatted tracebacks (``on_error``).
+    """
+    if isinstance(error, BaseException):
+        original = getattr(error, "original", None)  # CommandInvokeError wraps the real one
+        if isinstance(original, BaseException):
+            error = original
+        kind = f"{type(error).__module__}.{type(error).__qualname__}"
+        stack = traceback.extract_tb(error.__traceback__)[-frames:] if error.__traceback__ else []
+        parts = [kind] + [f"{f.filename}:{f.lineno}:{f.name}" for f in stack]
+    else:
+        lines = str(error).strip().splitlines()
+        kind = lines[-1].split(":", 1)[0] if lines else ""
+        stack = [m.groups() for m in map(_FRAME.match, lines) if m][-frames:]
+        parts = [kind] + [":".join(f) for f in stack]
+        if not stack:
+            parts.append(_ADDRESS.sub("0x?", lines[-1]) if lines else "")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
+
+class ErrorWindow:
+    """Windowed dedupe of error reports by fingerprint.
+
+    The first occurrence is reported; repeats within ``window`` seconds of that
+    report are only counted. Once the window has passed the next occurrence is
+    reported again together with how often it happened meanwhile, and
+    ``due_summaries`` picks up errors that stopped before that. Each
+    fingerprint costs a counter and two timestamps, however often it repeats.
+    """
+
+    def __init__(self, window=300):
+        self.window = window
+        self._entries = {}  # fingerprint -> {"first": last report, "last": ts, "suppressed": n, "title": str}
+
+    def record(self, fp, now, title=""):
+        """Count one occurrence; returns ``(report, count since the last report)``."""
+        entry = self._entries.get(fp)
+        if entry is None:
+            self._entries[fp] = {"first": now, "last": now, "suppressed": 0, "title": title}
+            return True, 1
+        entry["last"] = now
+        if now - entry["first"] >= self.window:
+            count = entry["suppressed"] + 1  # repeats no summary picked up yet, plus this one
+            entry["first"] = now
+            entry["suppressed"] = 0
+            return True, count
+        entry["suppressed"] += 1
+        return False, entry["suppressed"]
+
+    def due_summaries(self, now):
+        """``[(fingerprint, title, suppressed)]`` for errors whose window ran out."""
+        due = []
+        for fp, entry in list(self._entries.items()):
+            if now - entry["first"] < self.window:
+                continue
+            if entry["suppressed"]:
+                due.append((fp, entry["title"], entry["suppressed"]))
+                entry["suppressed"] = 0
+                entry["first"] = now
+            elif now - entry["last"] >= self.window:
+                del self._entries[fp]
+        return due
@@ -0,0 +1,44 @@
+from bisect import bisect_left, insort
+
+
+class RankedIndex:
+    """Per-user totals kept in descending order for leaderboard lookups.
+
+    ``top(limit)`` is a slice of an already sorted list, so it costs O(limit)
+    no matter how many users are tracked. Updates are a binary search plus a
+    list insert/delete, which stays cheap into the hundreds of thousands.
+    """
+
+    def __init__(self, totals=None):
+        self.totals = dict(totals or {})
+        self._order = sorted((-total, user_id) for user_id, total in self.totals.items())
+
+    def __len__(self):
+        return len(self.totals)
+
+    def __contains__(self, user_id):
+        return user_id in self.totals
+
+    def get(self, user_id, default=0):
+        return self.totals.get(user_id, default)
+
+    def set(self, user_id, total):
+        old = self.totals.get(user_id)
+        if old == total:
+            return
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, user_id))]
+        self.totals[user_id] = total
+        insort(self._order, (-total, user_id))
+
+    def add(self, user_id, delta):
+        self.set(user_id, self.totals.get(user_id, 0) + delta)
+
+    def remove(self, user_id):
+        old = self.totals.pop(user_id, None)
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, user_id))]
+
+    def top(self, limit):
+        """Return ``[(user_id, total), ...]`` for the ``limit`` highest totals."""
+        return [(user_id, -neg_total) for neg_total, user_id in self._order[:limit]]
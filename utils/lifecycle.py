@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+
+class Lifecycle:
+    """Separates the one-time startup from reconnects.
+
+    ``on_ready`` fires again after every full reconnect. Callbacks registered
+    with ``on_startup`` run on the first one only, ``on_reconnect`` callbacks on
+    every later one. They should only resync state that may have drifted
+    while the gateway was away. Reconnects closer together than
+    ``min_interval`` seconds are folded into one deferred resync, so a
+    flapping connection does not resync over and over.
+    """
+
+    def __init__(self, bot, min_interval=30):
+        self.bot = bot
+        self.min_interval = min_interval
+        self.started = False
+        self.connects = 0
+        self.resyncs = 0
+        self.deferred = 0
+        self._startup = {}    # name -> coroutine function
+        self._reconnect = {}  # name -> coroutine function
+        self._last_resync = None
+        self._pending = None
+
+    def on_startup(self, name, callback):
+        self._startup[name] = callback
+
+    def on_reconnect(self, name, callback):
+        self._reconnect[name] = callback
+
+    def remove(self, name):
+        self._startup.pop(name, None)
+        self._reconnect.pop(name, None)
+
+    async def _run(self, callbacks):
+        for name, callback in list(callbacks.items()):
+            try:
+                await callback()
+            except Exception as e:
+                print(f"[lifecycle] {name} failed: {e!r}")
+
+    async def handle_ready(self):
+        self.connects += 1
+        if not self.started:
+            self.started = True
+            self._last_resync = time.monotonic()
+            await self._run(self._startup)
+            return
+
+        wait = self.min_interval - (time.monotonic() - self._last_resync)
+        if wait > 0:
+            self.deferred += 1
+            if self._pending is None or self._pending.done():
+                self._pending = asyncio.create_task(self._resync_later(wait))
+            return
+        await self.resync()
+
+    async def _resync_later(self, delay):
+        await asyncio.sleep(delay)
+        await self.resync()
+
+    async def resync(self):
+        self._last_resync = time.monotonic()
+        self.resyncs += 1
+        await self._run(self._reconnect)
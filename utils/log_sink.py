@@ -0,0 +1,185 @@
+import asyncio
+
+import discord
+
+MAX_MESSAGE_CHARS = 1900
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+
+def pack_lines(lines, limit=MAX_MESSAGE_CHARS):
+    """Join ``lines`` into as few messages of at most ``limit`` characters as possible."""
+    chunk = ""
+    for line in lines:
+        while len(line) > limit:  # a single huge line gets split hard
+            if chunk:
+                yield chunk
+                chunk = ""
+            yield line[:limit]
+            line = line[limit:]
+        if chunk and len(chunk) + len(line) + 1 > limit:
+            yield chunk
+            chunk = ""
+        chunk = f"{chunk}\n{line}" if chunk else line
+    if chunk:
+        yield chunk
+
+
+def pack_embeds(embeds):
+    """Group embeds into messages of at most 10 embeds / 6000 characters."""
+    group, size = [], 0
+    for embed in embeds:
+        if group and (len(group) == MAX_EMBEDS or size + len(embed) > MAX_EMBED_CHARS):
+            yield group
+            group, size = [], 0
+        group.append(embed)
+        size += len(embed)
+    if group:
+        yield group
+
+
+class LogSink:
+    """Buffers log lines and embeds and sends them to Discord in batches.
+
+    ``log``/``log_embed`` never wait: they only append to a buffer. A background
+    task sends everything every ``interval`` seconds, or earlier once
+    ``flush_at`` entries are waiting. When more than ``max_buffer`` entries are
+    backlogged new ones are dropped and counted instead, so a log storm can not
+    block handlers or eat the rate limit. Entries for channels that can't be
+    resolved before the bot is ready wait in the buffer.
+    """
+
+    def __init__(self, interval=5.0, flush_at=50, max_buffer=500):
+        self.interval = interval
+        self.flush_at = flush_at
+        self.max_buffer = max_buffer
+        self.bot = None
+        self.channel_id = None
+
+        self._lines = {}   # channel id -> [line, ...]
+        self._embeds = {}  # channel id -> [embed, ...]
+        self._size = 0
+        self._wakeup = None
+        self._task = None
+        self._lock = asyncio.Lock()
+
+        self.sent = 0
+        self.logged = 0
+        self.dropped = 0
+        self._dropped_unreported = 0
+        self.failures = 0
+
+    def bind(self, bot, channel_id, interval=None, flush_at=None, max_buffer=None):
+        """Set the bot and default log channel (normally LOG_CHANNEL_ID)."""
+        self.bot = bot
+        self.channel_id = channel_id
+        self.interval = interval if interval is not None else self.interval
+        self.flush_at = flush_at if flush_at is not None else self.flush_at
+        self.max_buffer = max_buffer if max_buffer is not None else self.max_buffer
+
+    def stats(self):
+        return {
+            "queued": self._size,
+            "logged": self.logged,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+    # -------------------- Producers --------------------
+    def log(self, line, channel=None):
+        self._add(self._lines, channel, str(line))
+
+    def log_embed(self, embed, channel=None):
+        self._add(self._embeds, channel, embed)
+
+    def _add(self, buffers, channel, item):
+        if self._size >= self.max_buffer:
+            self.dropped += 1
+            self._dropped_unreported += 1
+            return
+        channel_id = channel.id if channel is not None else self.channel_id
+        if channel_id is None:
+            return
+        buffers.setdefault(channel_id, []).append(item)
+        self._size += 1
+        self.logged += 1
+        self._ensure_task()
+        if self._size >= self.flush_at and self._wakeup is not None:
+            self._wakeup.set()
+
+    # -------------------- Delivery --------------------
+    def _ensure_task(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop yet, the buffer is sent with the first flush
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Send everything buffered right now.
+
+        Entries for a channel the bot can't resolve yet stay queued until it is
+        ready; after that they are counted as dropped.
+        """
+        async with self._lock:
+            lines, self._lines = self._lines, {}
+            embeds, self._embeds = self._embeds, {}
+            self._size = 0
+            ready = self.bot is not None and self.bot.is_ready()
+            if self._dropped_unreported and self._resolve(self.channel_id) is not None:
+                lines.setdefault(self.channel_id, []).append(
+                    f"⚠️ {self._dropped_unreported} log message(s) dropped"
+                )
+                self._dropped_unreported = 0
+
+            for channel_id in lines.keys() | embeds.keys():
+                channel = self._resolve(channel_id)
+                if channel is None:
+                    pending = lines.get(channel_id, []), embeds.get(channel_id, [])
+                    if ready:
+                        count = sum(map(len, pending))
+                        self.dropped += count
+                        self._dropped_unreported += count
+                    else:
+                        self._requeue(channel_id, *pending)
+                    continue
+                for content in pack_lines(lines.get(channel_id, [])):
+                    await self._send(channel, content=content)
+                for group in pack_embeds(embeds.get(channel_id, [])):
+                    await self._send(channel, embeds=group)
+
+    def _resolve(self, channel_id):
+        if self.bot is None or channel_id is None:
+            return None
+        return self.bot.get_channel(channel_id)
+
+    def _requeue(self, channel_id, lines, embeds):
+        # in front of anything logged while this flush was sending
+        for buffers, items in ((self._lines, lines), (self._embeds, embeds)):
+            if items:
+                buffers[channel_id] = items + buffers.get(channel_id, [])
+                self._size += len(items)
+
+    async def _send(self, channel, **kwargs):
+        try:
+            await channel.send(**kwargs)
+            self.sent += 1
+        except discord.HTTPException as e:
+            self.failures += 1
+            print(f"[log] Failed to send to {channel.id}: {e}")
+
+
+log_sink = LogSink()
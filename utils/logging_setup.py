@@ -0,0 +1,64 @@
+import json
+import logging
+import logging.handlers
+import queue
+
+TEXT_FORMAT = "%(asctime)s:%(levelname)s:%(name)s: %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers and ``jq``."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _file_handler(settings):
+    path = settings.get("LOG_FILE", "discord.log")
+    if settings.get("LOG_ROTATE", "size") == "size":
+        return logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=settings.get("LOG_MAX_BYTES", 5 * 1024 * 1024),
+            backupCount=settings.get("LOG_BACKUP_COUNT", 5),
+            encoding="utf-8",
+        )
+    # any other value is a TimedRotatingFileHandler "when", e.g. "midnight" or "H"
+    return logging.handlers.TimedRotatingFileHandler(
+        path,
+        when=settings["LOG_ROTATE"],
+        backupCount=settings.get("LOG_BACKUP_COUNT", 5),
+        encoding="utf-8",
+    )
+
+
+def setup_logging(settings):
+    """Route all logging through a queue to a rotating file written by a background thread.
+
+    Levels come from ``LOG_LEVEL`` (root) and ``LOG_LEVELS`` (per logger, e.g.
+    ``{"discord.gateway": "WARNING"}``); ``LOG_JSON`` switches to JSON lines.
+    Returns the started ``QueueListener``; call ``stop()`` on it at shutdown.
+    """
+    handler = _file_handler(settings)
+    handler.setFormatter(JsonFormatter() if settings.get("LOG_JSON", False) else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.Queue(-1)
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(settings.get("LOG_LEVEL", "INFO").upper())
+
+    for name, level in settings.get("LOG_LEVELS", {"discord.gateway": "WARNING", "discord.http": "INFO"}).items():
+        logging.getLogger(name).setLevel(str(level).upper())
+
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,94 @@
+import time
+
+
+class Route:
+    __slots__ = ("name", "handler", "channels", "commands", "bots", "calls", "errors", "total", "max")
+
+    def __init__(self, name, handler, channels, commands, bots):
+        self.name = name
+        self.handler = handler
+        self.channels = channels
+        self.commands = commands
+        self.bots = bots
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class MessageRouter:
+    """Single on_message entry point shared by all cogs.
+
+    Cogs ``subscribe`` a handler, optionally limited to a set of channel ids.
+    The common checks (bot author, command prefix) run once per message and
+    the handlers for a channel come from a precomputed table, so a message
+    only reaches the handlers that care about its channel.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.routes = {}     # name -> Route
+        self._table = {}     # channel id -> [Route]
+        self._anywhere = []  # routes without a channel filter
+        self.messages = 0
+
+    # -------------------- Subscriptions --------------------
+    def subscribe(self, name, handler, channels=None, commands=False, bots=False):
+        """Call ``handler(message)`` for messages in ``channels`` (None = everywhere).
+
+        ``commands`` also passes messages starting with the command prefix,
+        ``bots`` also passes messages from bots.
+        """
+        self.routes[name] = Route(name, handler, None if channels is None else set(channels), commands, bots)
+        self._rebuild()
+
+    def unsubscribe(self, name):
+        if self.routes.pop(name, None) is not None:
+            self._rebuild()
+
+    def set_channels(self, name, channels):
+        self.routes[name].channels = set(channels)
+        self._rebuild()
+
+    def _rebuild(self):
+        table, anywhere = {}, []
+        for route in self.routes.values():
+            if route.channels is None:
+                anywhere.append(route)
+                continue
+            for channel_id in route.channels:
+                table.setdefault(channel_id, []).append(route)
+        self._table = {channel_id: routes + anywhere for channel_id, routes in table.items()}
+        self._anywhere = anywhere
+
+    # -------------------- Dispatch --------------------
+    async def dispatch(self, message):
+        self.messages += 1
+        is_bot = message.author.bot
+        is_command = message.content.startswith(self.bot.command_prefix)
+        for route in self._table.get(message.channel.id, self._anywhere):
+            if (is_bot and not route.bots) or (is_command and not route.commands):
+                continue
+            start = time.perf_counter()
+            try:
+                await route.handler(message)
+            except Exception:
+                route.errors += 1
+                await self.bot.on_error(f"on_message:{route.name}", message)
+            elapsed = time.perf_counter() - start
+            route.calls += 1
+            route.total += elapsed
+            route.max = max(route.max, elapsed)
+
+    def stats(self):
+        return [
+            {
+                "name": r.name,
+                "channels": "all" if r.channels is None else len(r.channels),
+                "calls": r.calls,
+                "errors": r.errors,
+                "avg_ms": (r.total / r.calls * 1000) if r.calls else 0.0,
+                "max_ms": r.max * 1000,
+            }
+            for r in self.routes.values()
+        ]
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def write_text_atomic(path, text):
+    """Write to a temp file, fsync it and rename it over ``path``."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_json_atomic(path, data, **dump_kwargs):
+    write_text_atomic(path, json.dumps(data, **dump_kwargs))
+
+
+class PersistenceService:
+    """Runs blocking file writes on a bounded thread pool.
+
+    Cogs call ``mark_dirty(key, snapshot, write)`` whenever some state changed.
+    ``snapshot()`` runs on the event loop right before the write starts and has
+    to return something the worker thread can use safely (a string or a copy).
+    ``write(state)`` then runs on the pool. Only one write per key is in flight
+    at a time; everything marked while a key is queued or being written
+    collapses into a single follow-up write of the newest state.
+    """
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="persistence")
+        self._pending = {}    # key -> (snapshot, write)
+        self._running = set()
+        self._idle = None
+
+        self.writes = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.max_depth = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+
+    # -------------------- Metrics --------------------
+    @property
+    def queue_depth(self):
+        return len(self._pending) + len(self._running)
+
+    def stats(self):
+        return {
+            "queued": len(self._pending),
+            "in_flight": len(self._running),
+            "max_depth": self.max_depth,
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "avg_ms": (self._total_latency / self.writes * 1000) if self.writes else 0.0,
+            "last_ms": self.last_latency * 1000,
+            "max_ms": self.max_latency * 1000,
+        }
+
+    def _record(self, elapsed, failed):
+        self.writes += 1
+        self.failures += failed
+        self.last_latency = elapsed
+        self.max_latency = max(self.max_latency, elapsed)
+        self._total_latency += elapsed
+
+    # -------------------- Dirty state --------------------
+    def mark_dirty(self, key, snapshot, write):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            write(snapshot())  # no event loop (startup/scripts): nothing to block
+            return
+
+        if key in self._pending:
+            self.coalesced += 1
+        self._pending[key] = (snapshot, write)
+        self.max_depth = max(self.max_depth, self.queue_depth)
+        if self._idle is not None:
+            self._idle.clear()
+        if key not in self._running:
+            self._start(loop, key)
+
+    def _start(self, loop, key):
+        snapshot, write = self._pending.pop(key)
+        try:
+            state = snapshot()
+        except Exception as e:
+            print(f"[persistence] Snapshot for {key} failed: {e!r}")
+            self._finish(loop, key)
+            return
+        self._running.add(key)
+        future = loop.run_in_executor(self._executor, self._timed, write, state)
+        future.add_done_callback(lambda f: self._done(loop, key, f))
+
+    @staticmethod
+    def _timed(fn, *args):
+        start = time.perf_counter()
+        try:
+            fn(*args)
+            error = None
+        except Exception as e:
+            error = e
+        return time.perf_counter() - start, error
+
+    def _done(self, loop, key, future):
+        self._running.discard(key)
+        if future.cancelled():
+            elapsed, error = 0.0, "cancelled"
+        else:
+            elapsed, error = future.result()
+        if error is not None:
+            print(f"[persistence] Write for {key} failed: {error!r}")
+        self._record(elapsed, error is not None)
+        self._finish(loop, key)
+
+    def _finish(self, loop, key):
+        if key in self._pending:
+            self._start(loop, key)
+        elif not self._pending and not self._running and self._idle is not None:
+            self._idle.set()
+
+    async def flush(self):
+        """Wait until every queued write has hit the disk."""
+        if not self._pending and not self._running:
+            return
+        if self._idle is None:
+            self._idle = asyncio.Event()
+        await self._idle.wait()
+
+    # -------------------- One-off jobs --------------------
+    async def run(self, fn, *args):
+        """Run a blocking job (e.g. building an archive) on the pool."""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await loop.run_in_executor(self._executor, fn, *args)
+            failed = False
+            return result
+        finally:
+            self._record(time.perf_counter() - start, failed)
+
+
+class DebouncedWriter:
+    """Group commit for state that changes much more often than it needs saving.
+
+    ``touch()`` marks the state dirty. ``flush_fn`` (a coroutine function) is then
+    awaited once ``interval`` seconds have passed or ``max_updates`` changes
+    have piled up, whichever comes first. ``interval`` is therefore the most
+    that can be lost in a crash. Call ``flush()`` on unload/shutdown.
+    """
+
+    def __init__(self, flush_fn, interval=2.0, max_updates=25):
+        self.flush_fn = flush_fn
+        self.interval = interval
+        self.max_updates = max_updates
+        self.updates = 0
+        self.flushes = 0
+        self._timer = None
+        self._task = None
+
+    def touch(self):
+        self.updates += 1
+        loop = asyncio.get_running_loop()
+        if self.updates >= self.max_updates:
+            self._schedule(loop, 0)
+        elif self._timer is None and self._task is None:
+            self._schedule(loop, self.interval)
+
+    def _schedule(self, loop, delay):
+        if self._task is not None:
+            return  # the running flush reschedules itself if still dirty
+        if self._timer is not None:
+            if delay:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_later(delay, self._start)
+
+    def _start(self):
+        self._timer = None
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        try:
+            while self.updates:
+                self.updates = 0
+                try:
+                    await self.flush_fn()
+                    self.flushes += 1
+                except Exception as e:
+                    print(f"[persistence] Debounced flush failed: {e!r}")
+                    self.updates += 1  # keep it dirty, retry with the next schedule
+                    break
+        finally:
+            self._task = None
+            if self.updates:
+                self._schedule(asyncio.get_running_loop(), self.interval)
+
+    async def flush(self):
+        """Write pending changes right now and wait for them."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._task is not None:
+            await self._task
+        if self.updates:
+            self.updates = 0
+            await self.flush_fn()
+            self.flushes += 1
+
+
+persistence = PersistenceService()
@@ -0,0 +1,166 @@
+"""Single owner of the bot's presence.
+
+Discord allows only a handful of presence updates per minute, so nothing
+calls ``bot.change_presence`` directly. ``PresenceManager.request`` records
+the desired presence and:
+
+* mirrors it into ``bot.status``/``bot.activity``, which discord.py sends with
+  IDENTIFY, so startups and reconnects carry it without an extra update;
+* skips it when it equals what was last sent;
+* otherwise sends it at most once per ``min_interval`` seconds, requests in
+  between only replace the pending one (the newest wins).
+
+Rotation through ``ACTIVITY_ROTATION`` goes through the same path, one
+request per ``PRESENCE_ROTATE_INTERVAL`` (never shorter than ``min_interval``).
+"""
+import asyncio
+import time
+
+import discord
+
+ACTIVITY_TYPES = {
+    "playing": discord.ActivityType.playing,
+    "listening": discord.ActivityType.listening,
+    "watching": discord.ActivityType.watching,
+    "streaming": discord.ActivityType.streaming,
+    "competing": discord.ActivityType.competing,
+}
+
+
+def _selected(value, default):
+    # [selected index, [options...]] as stored for STATUS and ACTIVITY_TYPE
+    if isinstance(value, (list, tuple)) and len(value) == 2 and 0 <= value[0] < len(value[1]):
+        return str(value[1][value[0]]).lower()
+    return default
+
+
+def presence_from_config(settings):
+    """``(status, activity type, activity name)`` from STATUS, ACTIVITY_TYPE and ACTIVITY."""
+    name = settings.get("ACTIVITY", "!help")
+    if not isinstance(name, str) or not name:
+        name = "!help"
+    return (
+        _selected(settings.get("STATUS"), "online"),
+        _selected(settings.get("ACTIVITY_TYPE"), "playing"),
+        name,
+    )
+
+
+def rotation_from_config(settings, base):
+    """``ACTIVITY_ROTATION`` entries ("name" or ["type", "name"]) as presences with ``base``'s status."""
+    rotation = []
+    for entry in settings.get("ACTIVITY_ROTATION", []):
+        if isinstance(entry, str):
+            rotation.append((base[0], base[1], entry))
+        elif isinstance(entry, (list, tuple)) and len(entry) == 2:
+            rotation.append((base[0], str(entry[0]).lower(), str(entry[1])))
+    return rotation
+
+
+def build(presence):
+    status, activity_type, name = presence
+    return (
+        getattr(discord.Status, status, discord.Status.online),
+        discord.Activity(type=ACTIVITY_TYPES.get(activity_type, discord.ActivityType.playing), name=name),
+    )
+
+
+class PresenceManager:
+    def __init__(self, bot, min_interval=12.0):
+        self.bot = bot
+        self.min_interval = min_interval
+        self.desired = None
+        self.sent = None
+        self.rotation = []
+        self.rotate_interval = 300
+        self._last_send = None
+        self._pending = None  # task sending the newest desired presence
+        self._rotator = None
+        self.running = False
+
+        self.requests = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self.sends = 0
+        self.failures = 0
+
+    # -------------------- Desired presence --------------------
+    def apply_config(self, settings):
+        base = presence_from_config(settings)
+        self.rotation = rotation_from_config(settings, base)
+        self.rotate_interval = max(settings.get("PRESENCE_ROTATE_INTERVAL", 300), self.min_interval)
+        self.request(self.rotation[0] if self.rotation else base)
+        if self.running:
+            self.start()  # restart with the new list and interval
+
+    def request(self, presence):
+        self.requests += 1
+        self.desired = presence
+        self.bot.status, self.bot.activity = build(presence)
+
+        if self._pending is not None and not self._pending.done():
+            self.coalesced += 1  # the pending send picks up the newest presence
+            return
+        if presence == self.sent:
+            self.skipped += 1
+            return
+        if not self.bot.is_ready():
+            return  # the next IDENTIFY carries it
+        wait = 0 if self._last_send is None else self.min_interval - (time.monotonic() - self._last_send)
+        self._pending = asyncio.get_running_loop().create_task(self._send(max(wait, 0)))
+
+    async def _send(self, delay):
+        while True:
+            if delay:
+                await asyncio.sleep(delay)
+            presence = self.desired
+            if presence == self.sent:
+                self.skipped += 1
+                return
+            status, activity = build(presence)
+            self._last_send = time.monotonic()
+            try:
+                await self.bot.change_presence(status=status, activity=activity)
+            except Exception as e:
+                self.failures += 1
+                print(f"[presence] Update failed: {e!r}")
+            else:
+                self.sent = presence
+                self.sends += 1
+            if self.desired == presence:
+                return  # after a failure bot.status/bot.activity still hold it for the next IDENTIFY
+            delay = self.min_interval  # requested while this one was being sent
+
+    def identified(self):
+        """Call on (re)connect: the new session was identified with the desired presence."""
+        self.sent = self.desired
+
+    # -------------------- Rotation --------------------
+    def start(self):
+        self.stop()
+        self.running = True
+        if len(self.rotation) > 1:
+            self._rotator = asyncio.get_running_loop().create_task(self._rotate())
+
+    def stop(self):
+        self.running = False
+        if self._rotator is not None:
+            self._rotator.cancel()
+            self._rotator = None
+
+    async def _rotate(self):
+        index = self.rotation.index(self.desired) if self.desired in self.rotation else 0
+        while True:
+            await asyncio.sleep(self.rotate_interval)
+            index = (index + 1) % len(self.rotation)
+            self.request(self.rotation[index])
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "skipped": self.skipped,
+            "coalesced": self.coalesced,
+            "sends": self.sends,
+            "failures": self.failures,
+            "rotation": len(self.rotation),
+        }
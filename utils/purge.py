@@ -0,0 +1,84 @@
+import asyncio
+from datetime import timedelta
+
+import discord
+
+BULK_LIMIT = 100
+# Discord refuses bulk deletes of messages older than 14 days; keep a margin for clock skew
+BULK_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+
+
+class PurgeResult:
+    __slots__ = ("deleted", "failed", "forbidden")
+
+    def __init__(self):
+        self.deleted = 0
+        self.failed = 0
+        self.forbidden = False
+
+
+async def purge(channel, limit, before=None, progress=None, concurrency=3):
+    """Delete up to ``limit`` messages from ``channel`` as fast as the API allows.
+
+    History is paged lazily. Messages younger than 14 days are removed with
+    bulk deletes of up to 100; older ones are deleted one by one, at most
+    ``concurrency`` at a time (discord.py waits out the rate limit buckets).
+    ``progress(result)`` is awaited after every batch.
+    """
+    result = PurgeResult()
+    cutoff = discord.utils.utcnow() - BULK_MAX_AGE
+    semaphore = asyncio.Semaphore(concurrency)
+    young, old_tasks = [], []
+
+    async def report():
+        if progress is not None:
+            await progress(result)
+
+    async def delete_bulk(messages):
+        try:
+            if len(messages) == 1:
+                await messages[0].delete()
+            else:
+                await channel.delete_messages(messages)
+            result.deleted += len(messages)
+        except discord.Forbidden:
+            result.forbidden = True
+        except discord.NotFound:
+            pass  # already gone
+        except discord.HTTPException:
+            result.failed += len(messages)
+        await report()
+
+    async def delete_old(message):
+        async with semaphore:
+            if result.forbidden:
+                return
+            try:
+                await message.delete()
+                result.deleted += 1
+                if result.deleted % 25 == 0:
+                    await report()
+            except discord.Forbidden:
+                result.forbidden = True
+            except discord.NotFound:
+                pass
+            except discord.HTTPException:
+                result.failed += 1
+
+    async for message in channel.history(limit=limit, before=before):
+        if result.forbidden:
+            break
+        if message.created_at > cutoff:
+            young.append(message)
+            if len(young) == BULK_LIMIT:
+                await delete_bulk(young)
+                young = []
+        else:
+            old_tasks.append(asyncio.create_task(delete_old(message)))
+
+    if young and not result.forbidden:
+        await delete_bulk(young)
+    if old_tasks:
+        await asyncio.gather(*old_tasks)
+        await report()
+    return result
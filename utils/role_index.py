@@ -0,0 +1,90 @@
+import re
+
+from utils.lru import LRUCache
+
+CUSTOM_EMOJI = re.compile(r"<a?:\w+:(\d+)>")
+
+
+def emoji_key(emoji):
+    """Key for a ``PartialEmoji``/``Emoji`` or an emoji string as written in a message."""
+    if not isinstance(emoji, str):
+        return str(emoji.id) if emoji.id else emoji.name.replace("\ufe0f", "")
+    match = CUSTOM_EMOJI.fullmatch(emoji)
+    return match.group(1) if match else emoji.replace("\ufe0f", "")
+
+
+def _is_emoji(token):
+    # unicode emoji are never ASCII, this keeps "--->" or "**Title**" lines out of the mapping
+    return bool(CUSTOM_EMOJI.fullmatch(token)) or not any(c.isalnum() or c.isascii() for c in token)
+
+
+def parse_role_message(content):
+    """Turn the text of a role message into ``{emoji key or None: role name}``.
+
+    A message is either just a role name (any reaction gives that role) or one
+    ``<emoji> <role name>`` per line. A single line is kept as a whole too,
+    since role names may start with an emoji themselves.
+    """
+    content = content.strip()
+    mapping = {}
+    for line in content.splitlines():
+        parts = line.strip().split(maxsplit=1)
+        if len(parts) == 2 and _is_emoji(parts[0]):
+            mapping[emoji_key(parts[0])] = parts[1].strip()
+    if content and "\n" not in content:
+        mapping[None] = content
+    return mapping
+
+
+class RoleIndex:
+    """Maps a reaction on a role message to a role id without scans or fetches.
+
+    ``messages`` holds the parsed role messages per (guild_id, message_id) and
+    ``role_ids`` the role names of every guild, so a lookup is two dict hits.
+    Both are kept current from gateway events by the reaction role cog.
+    """
+
+    def __init__(self, maxsize=512):
+        self.messages = LRUCache(maxsize)  # (guild_id, message_id) -> {emoji key|None: role name}
+        self.role_ids = {}                 # guild_id -> {role name: role_id}
+
+    # -------------------- Messages --------------------
+    def add_message(self, guild_id, message_id, content):
+        mapping = parse_role_message(content)
+        self.messages.put((guild_id, message_id), mapping)
+        return mapping
+
+    def remove_message(self, guild_id, message_id):
+        self.messages.pop((guild_id, message_id))
+
+    def get_message(self, guild_id, message_id):
+        """Parsed role message, or None if it is not indexed (counts as a miss)."""
+        return self.messages.get((guild_id, message_id))
+
+    # -------------------- Roles --------------------
+    def index_roles(self, guild):
+        names = {}
+        for role in guild.roles:
+            names.setdefault(role.name, role.id)  # same winner as discord.utils.get on duplicate names
+        self.role_ids[guild.id] = names
+
+    def role_created(self, role):
+        self.role_ids.setdefault(role.guild.id, {}).setdefault(role.name, role.id)
+
+    def role_updated(self, before, after):
+        if before.name != after.name:
+            self.index_roles(after.guild)
+
+    def role_deleted(self, role):
+        if self.role_ids.get(role.guild.id, {}).get(role.name) == role.id:
+            self.index_roles(role.guild)
+
+    def resolve(self, guild_id, mapping, emoji):
+        """Return ``(role name, role id)`` for a reaction; the id is None if the role does not exist."""
+        names = self.role_ids.get(guild_id, {})
+        role_name = mapping.get(emoji_key(emoji))
+        if role_name is not None and role_name in names:
+            return role_name, names[role_name]
+        if None in mapping:
+            return mapping[None], names.get(mapping[None])
+        return role_name, None
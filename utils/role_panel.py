@@ -0,0 +1,115 @@
+"""Renders the role channel panel from a role catalogue and keeps it posted.
+
+The catalogue (``ROLE_PANEL`` in config.json, falls back to ``DEFAULT_ROLE_PANEL``)::
+
+    {"header": ["line", ...],
+     "sections": [{"title": "...", "roles": [{"name": "...", "emoji": "...", "description": "..."}]}]}
+
+Every role is written as ``<emoji> <role name>`` so the reaction role index
+can map the reaction back to the role. Roles without an emoji get the next
+free regional indicator (🇦, 🇧, ...) of their message.
+"""
+import discord
+
+from utils.role_index import emoji_key
+
+STATE_KEY = "role_panel"  # {"channel_id": ..., "message_ids": [...]} in the state table
+MAX_CHARS = 1900
+MAX_REACTIONS = 20
+_LETTERS = [chr(0x1F1E6 + i) for i in range(26)]
+
+DEFAULT_ROLE_PANEL = {
+    "header": [
+        "In diesem Channel kannst du dir Rollen vergeben, so kannst du Entscheiden was dich interressiert.",
+        "Reagiere mit dem Emoji vor einer Rolle um sie zu erhalten bzw. entferne die Reaktion um sie zu verlieren.",
+    ],
+    "sections": [
+        {"title": "**🅰️ ALLGEMEIN:**", "roles": [
+            {"name": "Gooner", "description": "---> Mit dieser Rolle erlangst du Einblick in alle Channel"},
+            {"name": "Informatik-Junkie"},
+        ]},
+        {"title": "**🅱️ Spiele:**", "roles": [
+            {"name": "Minecraft"},
+            {"name": "Terraria"},
+            {"name": "Satisfactory"},
+            {"name": "PEAK"},
+            {"name": "Riot-Games"},
+        ]},
+    ],
+}
+
+
+def render_panel(panel):
+    """Return ``[(content, [emoji, ...]), ...]``: as few messages as the limits allow."""
+    messages = []
+    lines, emojis, size = list(panel.get("header", [])), [], 0
+    size = sum(len(line) + 1 for line in lines)
+
+    def flush():
+        nonlocal lines, emojis, size
+        if lines:
+            messages.append(("\n".join(lines).strip(), emojis))
+        lines, emojis, size = [], [], 0
+
+    for section in panel.get("sections", []):
+        block = ["", section["title"]] if section.get("title") else [""]
+        block_size = sum(len(line) + 1 for line in block)
+        if size + block_size > MAX_CHARS:
+            flush()
+        lines += block
+        size += block_size
+        for role in section.get("roles", []):
+            role_lines = []
+            emoji = role.get("emoji")
+            if len(emojis) == MAX_REACTIONS or (emoji is None and len(emojis) == len(_LETTERS)):
+                flush()
+            if emoji is None:
+                emoji = next(e for e in _LETTERS if e not in emojis)
+            role_lines.append(f"{emoji} {role['name']}")
+            if role.get("description"):
+                role_lines.append(role["description"])
+            role_size = sum(len(line) + 1 for line in role_lines)
+            if size + role_size > MAX_CHARS:
+                flush()
+            lines += role_lines
+            emojis.append(emoji)
+            size += role_size
+    flush()
+    return messages
+
+
+async def sync_panel(channel, rendered, message_ids):
+    """Make ``channel`` show ``rendered`` using the posted ``message_ids``; returns the messages.
+
+    Unchanged messages cost one fetch, changed ones an edit, missing ones a
+    send; leftovers are deleted. Only reactions the bot is missing (or no
+    longer needs) are added or removed.
+    """
+    existing = []
+    for message_id in message_ids:
+        try:
+            existing.append(await channel.fetch_message(message_id))
+        except discord.NotFound:
+            pass
+
+    messages = []
+    for i, (content, emojis) in enumerate(rendered):
+        message = existing[i] if i < len(existing) else None
+        if message is None:
+            message = await channel.send(content)
+        elif message.content != content:
+            message = await message.edit(content=content)
+
+        mine = {emoji_key(r.emoji): r.emoji for r in message.reactions if r.me}
+        wanted = {emoji_key(e): e for e in emojis}
+        for key, emoji in wanted.items():
+            if key not in mine:
+                await message.add_reaction(emoji)
+        for key, emoji in mine.items():
+            if key not in wanted:
+                await message.remove_reaction(emoji, channel.guild.me)
+        messages.append(message)
+
+    for message in existing[len(rendered):]:
+        await message.delete()
+    return messages
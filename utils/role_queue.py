@@ -0,0 +1,52 @@
+class RoleChangeQueue:
+    """Pending role changes per member, applied later in one go per member.
+
+    Adding a role that is queued for removal (or the other way round) cancels
+    both, so a quick click and unclick never reaches the API. Only the net
+    changes are sent, role by role, never a full replacement of the member's
+    role list: that list comes from the cache and would undo changes made
+    meanwhile by moderators or other bots.
+    """
+
+    def __init__(self):
+        self._pending = {}  # (guild_id, member_id) -> (member, {role_id: (role, add)})
+        self.queued = 0
+        self.cancelled = 0
+        self.edits = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _change(self, member, role, add):
+        key = (member.guild.id, member.id)
+        _, changes = self._pending.get(key, (None, {}))
+        self.queued += 1
+        previous = changes.pop(role.id, None)
+        if previous is not None and previous[1] != add:
+            self.cancelled += 2
+        else:
+            changes[role.id] = (role, add)
+        if changes:
+            self._pending[key] = (member, changes)  # keep the newest member object
+        else:
+            self._pending.pop(key, None)
+
+    def add(self, member, role):
+        self._change(member, role, True)
+
+    def remove(self, member, role):
+        self._change(member, role, False)
+
+    def drain(self):
+        """Return and forget ``[(member, [(role, add), ...]), ...]``."""
+        pending, self._pending = self._pending, {}
+        return [(member, list(changes.values())) for member, changes in pending.values()]
+
+    @staticmethod
+    def net_changes(member, changes):
+        """``(roles to add, roles to remove)``, leaving out what ``member`` already has (or lacks)."""
+        current = {r.id for r in member.roles}
+        default_role = member.guild.default_role.id  # @everyone can't be added or removed
+        adds = [role for role, add in changes if add and role.id not in current and role.id != default_role]
+        removes = [role for role, add in changes if not add and role.id in current and role.id != default_role]
+        return adds, removes
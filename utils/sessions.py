@@ -0,0 +1,125 @@
+class SessionTracker:
+    """Index of the activity and voice sessions that are currently running.
+
+    The totals themselves stay in the tracker's ``activity_times`` and
+    ``voice_times`` dicts. This class only remembers which entries are open, so
+    settling costs O(open sessions) instead of O(everything ever recorded).
+    """
+
+    def __init__(self, activity_times, voice_times, blacklist):
+        self.activity_times = activity_times
+        self.voice_times = voice_times
+        self.blacklist = blacklist
+
+        self.open_activities = {}  # (user_id, act_name) -> start timestamp
+        self.open_voice = {}       # user_id -> start timestamp
+        self._user_activities = {} # user_id -> set of open act_names
+
+        # callbacks(user_id, act_name, field, elapsed); act_name is None for voice
+        self.listeners = []
+
+    def __len__(self):
+        return len(self.open_activities) + len(self.open_voice)
+
+    # -------------------- Internals --------------------
+    def _field(self, act_name):
+        return "duplicate" if act_name.lower() in self.blacklist else "main"
+
+    def _credit(self, user_id, act_name, field, elapsed):
+        if elapsed <= 0:
+            return
+        for listener in self.listeners:
+            listener(user_id, act_name, field, elapsed)
+
+    def _settle_activity(self, user_id, act_name, now, close=False):
+        key = (user_id, act_name)
+        start = self.open_activities.get(key)
+        if start is None:
+            return 0
+        entry = self.activity_times[user_id][act_name]
+        elapsed = max(0, now - start)
+        field = self._field(act_name)
+        entry[field] += elapsed
+        if close:
+            del self.open_activities[key]
+            self._user_activities[user_id].discard(act_name)
+            if not self._user_activities[user_id]:
+                del self._user_activities[user_id]
+            entry["ongoing_start"] = None
+        else:
+            self.open_activities[key] = now
+            entry["ongoing_start"] = now
+        self._credit(user_id, act_name, field, elapsed)
+        return elapsed
+
+    def _settle_voice(self, user_id, now, close=False):
+        start = self.open_voice.get(user_id)
+        if start is None:
+            return 0
+        entry = self.voice_times[user_id]
+        elapsed = max(0, now - start)
+        entry["total"] += elapsed
+        if close:
+            del self.open_voice[user_id]
+            entry["ongoing_start"] = None
+        else:
+            self.open_voice[user_id] = now
+            entry["ongoing_start"] = now
+        self._credit(user_id, None, "total", elapsed)
+        return elapsed
+
+    # -------------------- Activities --------------------
+    def open_activity(self, user_id, act_name, now):
+        """Start a session; returns False if it was already running."""
+        if (user_id, act_name) in self.open_activities:
+            return False
+        entry = self.activity_times.setdefault(user_id, {}).setdefault(
+            act_name, {"main": 0, "duplicate": 0, "ongoing_start": None}
+        )
+        entry["ongoing_start"] = now
+        self.open_activities[(user_id, act_name)] = now
+        self._user_activities.setdefault(user_id, set()).add(act_name)
+        return True
+
+    def close_activity(self, user_id, act_name, now):
+        """Stop a session and return the seconds credited by closing it."""
+        return self._settle_activity(user_id, act_name, now, close=True)
+
+    def sync_activities(self, user_id, current, now):
+        """Open/close sessions so that exactly ``current`` is running for the user."""
+        running = self._user_activities.get(user_id, set())
+        for act_name in running - current:
+            self.close_activity(user_id, act_name, now)
+        for act_name in current - running:
+            self.open_activity(user_id, act_name, now)
+
+    # -------------------- Voice --------------------
+    def open_voice_session(self, user_id, now):
+        if user_id in self.open_voice:
+            return False
+        entry = self.voice_times.setdefault(user_id, {"total": 0, "ongoing_start": None})
+        entry["ongoing_start"] = now
+        self.open_voice[user_id] = now
+        return True
+
+    def close_voice_session(self, user_id, now):
+        return self._settle_voice(user_id, now, close=True)
+
+    # -------------------- Settling --------------------
+    def settle(self, now):
+        """Credit elapsed time of every open session without closing it."""
+        for user_id, act_name in list(self.open_activities):
+            self._settle_activity(user_id, act_name, now)
+        for user_id in list(self.open_voice):
+            self._settle_voice(user_id, now)
+
+    def settle_user(self, user_id, now):
+        for act_name in list(self._user_activities.get(user_id, ())):
+            self._settle_activity(user_id, act_name, now)
+        self._settle_voice(user_id, now)
+
+    def close_all(self, now):
+        for user_id, act_name in list(self.open_activities):
+            self._settle_activity(user_id, act_name, now, close=True)
+        for user_id in list(self.open_voice):
+            self._settle_voice(user_id, now, close=True)
@@ -0,0 +1,229 @@
+"""Compact binary format for the weekly activity snapshots in weekly_backup/.
+
+A ``.wsnap`` file is laid out as::
+
+    header      magic "WSNP", version, user count, activity-name count, name block size
+    names       zlib-compressed, length-prefixed UTF-8 activity names (interned once per file)
+    directory   one fixed-size row per user, sorted by user id:
+                user id (u64), block offset (u32), block size (u32), voice seconds (u32)
+    blocks      one zlib-compressed block per user holding three packed u32 columns:
+                activity index, main seconds, duplicate seconds
+
+The directory is sorted, so ``SnapshotReader.read_user`` only needs a binary
+search and one block read. ``iter_users`` streams the whole week block by
+block without building the full dict.
+
+Convert existing JSON snapshots with:
+
+    python -m utils.snapshots convert weekly_backup [--remove]
+"""
+import argparse
+import json
+import os
+import struct
+import zlib
+from array import array
+from bisect import bisect_left
+
+MAGIC = b"WSNP"
+VERSION = 1
+EXTENSION = ".wsnap"
+
+_HEADER = struct.Struct("<4sBxxxIII")   # magic, version, users, names, names block size
+_DIRECTORY_ROW = struct.Struct("<QIII")  # user id, offset, size, voice seconds
+_NO_VOICE = 0xFFFFFFFF
+
+
+def _u32_column(values):
+    column = array("I", values)
+    if column.itemsize != 4:  # pragma: no cover - exotic platforms
+        column = array("L", values)
+    return column
+
+
+def write_snapshot(path, activity_times, voice_times):
+    """Write one week of ``activity_times``/``voice_times`` to ``path`` atomically."""
+    names = {}
+    for acts in activity_times.values():
+        for act in acts:
+            names.setdefault(act, len(names))
+
+    user_ids = sorted({int(u) for u in activity_times} | {int(u) for u in voice_times})
+
+    name_block = bytearray()
+    for act in names:
+        encoded = act.encode("utf-8")
+        name_block += struct.pack("<H", len(encoded)) + encoded
+    name_block = zlib.compress(bytes(name_block))
+
+    blocks, rows = [], []
+    offset = _HEADER.size + len(name_block) + _DIRECTORY_ROW.size * len(user_ids)
+    for user_id in user_ids:
+        acts = activity_times.get(str(user_id), {})
+        indexes = _u32_column(names[act] for act in acts)
+        mains = _u32_column(v.get("main", 0) for v in acts.values())
+        duplicates = _u32_column(v.get("duplicate", 0) for v in acts.values())
+        block = zlib.compress(indexes.tobytes() + mains.tobytes() + duplicates.tobytes())
+
+        voice = voice_times.get(str(user_id))
+        voice_total = voice.get("total", 0) if voice is not None else _NO_VOICE
+        rows.append(_DIRECTORY_ROW.pack(user_id, offset, len(block), voice_total))
+        blocks.append(block)
+        offset += len(block)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(user_ids), len(names), len(name_block)))
+        f.write(name_block)
+        f.writelines(rows)
+        f.writelines(blocks)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SnapshotReader:
+    """Random and streaming access to a ``.wsnap`` file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        magic, version, self.user_count, name_count, name_size = _HEADER.unpack(self._file.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            self._file.close()
+            raise ValueError(f"{path} is not a version {VERSION} weekly snapshot")
+
+        raw = zlib.decompress(self._file.read(name_size))
+        self.activity_names = []
+        pos = 0
+        for _ in range(name_count):
+            (length,) = struct.unpack_from("<H", raw, pos)
+            self.activity_names.append(raw[pos + 2:pos + 2 + length].decode("utf-8"))
+            pos += 2 + length
+
+        self._directory = self._file.read(_DIRECTORY_ROW.size * self.user_count)
+        self._user_ids = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def _row(self, i):
+        return _DIRECTORY_ROW.unpack_from(self._directory, i * _DIRECTORY_ROW.size)
+
+    def user_ids(self):
+        if self._user_ids is None:
+            self._user_ids = [self._row(i)[0] for i in range(self.user_count)]
+        return self._user_ids
+
+    def _read_block(self, offset, size):
+        self._file.seek(offset)
+        raw = zlib.decompress(self._file.read(size))
+        columns = _u32_column(())
+        columns.frombytes(raw)
+        n = len(columns) // 3
+        return {
+            self.activity_names[columns[i]]: {"main": columns[n + i], "duplicate": columns[2 * n + i]}
+            for i in range(n)
+        }
+
+    def read_user(self, user_id):
+        """Return ``(activities, voice_total)`` for one user, or None if absent."""
+        user_id = int(user_id)
+        ids = self.user_ids()
+        i = bisect_left(ids, user_id)
+        if i == len(ids) or ids[i] != user_id:
+            return None
+        _, offset, size, voice = self._row(i)
+        return self._read_block(offset, size), (None if voice == _NO_VOICE else voice)
+
+    def iter_users(self):
+        """Yield ``(user_id, activities, voice_total)`` one user at a time."""
+        for i in range(self.user_count):
+            user_id, offset, size, voice = self._row(i)
+            yield str(user_id), self._read_block(offset, size), (None if voice == _NO_VOICE else voice)
+
+    def to_dicts(self):
+        activity_times, voice_times = {}, {}
+        for user_id, acts, voice in self.iter_users():
+            if acts:
+                activity_times[user_id] = acts
+            if voice is not None:
+                voice_times[user_id] = {"total": voice}
+        return activity_times, voice_times
+
+
+def list_snapshots(directory):
+    """Paths of all weekly snapshots in ``directory``; a ``.wsnap`` wins over its JSON original."""
+    by_stem = {}
+    for file in os.listdir(directory):
+        stem, ext = os.path.splitext(file)
+        if not stem.startswith("weekly_data_") or ext not in (EXTENSION, ".json"):
+            continue
+        if ext == EXTENSION or stem not in by_stem:
+            by_stem[stem] = os.path.join(directory, file)
+    return [by_stem[stem] for stem in sorted(by_stem)]
+
+
+def iter_snapshot(path):
+    """Yield ``(user_id, activities, voice_total)`` from a ``.wsnap`` or legacy ``.json`` snapshot."""
+    if path.endswith(EXTENSION):
+        with SnapshotReader(path) as reader:
+            yield from reader.iter_users()
+        return
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    activity_times, voice_times = data.get("activity_times", {}), data.get("voice_times", {})
+    for user_id in activity_times.keys() | voice_times.keys():
+        acts = {
+            act: {"main": v.get("main", 0), "duplicate": v.get("duplicate", 0)}
+            for act, v in activity_times.get(user_id, {}).items()
+        }
+        voice = voice_times.get(user_id)
+        yield user_id, acts, (voice.get("total", 0) if voice is not None else None)
+
+
+def load_snapshot(path):
+    activity_times, voice_times = {}, {}
+    for user_id, acts, voice in iter_snapshot(path):
+        if acts:
+            activity_times[user_id] = acts
+        if voice is not None:
+            voice_times[user_id] = {"total": voice}
+    return activity_times, voice_times
+
+
+def convert_json_snapshots(directory, remove=False):
+    """Convert every ``weekly_data_*.json`` in ``directory`` to ``.wsnap``."""
+    converted = []
+    for file in sorted(os.listdir(directory)):
+        if not (file.startswith("weekly_data_") and file.endswith(".json")):
+            continue
+        src = os.path.join(directory, file)
+        dest = os.path.splitext(src)[0] + EXTENSION
+        activity_times, voice_times = load_snapshot(src)
+        write_snapshot(dest, activity_times, voice_times)
+        if load_snapshot(dest) != (activity_times, voice_times):
+            raise ValueError(f"Round trip check failed for {file}")
+        if remove:
+            os.remove(src)
+        converted.append(file)
+    return converted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weekly snapshot tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="convert weekly_data_*.json files to .wsnap")
+    convert.add_argument("directory", nargs="?", default="weekly_backup")
+    convert.add_argument("--remove", action="store_true", help="delete the JSON files after converting")
+    args = parser.parse_args()
+
+    done = convert_json_snapshots(args.directory, remove=args.remove)
+    print(f"Converted {len(done)} snapshot(s): {', '.join(done) if done else '-'}")
@@ -0,0 +1,95 @@
+import re
+
+
+class Trigger:
+    """One trigger from the config: what to look for, where, and what to answer."""
+    __slots__ = ("pattern", "response", "regex", "word", "ignore_case", "channels", "delete")
+
+    def __init__(self, pattern, response, regex=False, word=False, ignore_case=True, channels=None, delete=True):
+        self.pattern = pattern
+        self.response = response
+        self.regex = regex
+        self.word = word
+        self.ignore_case = ignore_case
+        self.channels = frozenset(int(c) for c in channels) if channels else None
+        self.delete = delete
+
+    @classmethod
+    def from_config(cls, entry):
+        return cls(
+            entry["pattern"],
+            entry.get("response", ""),
+            regex=entry.get("regex", False),
+            word=entry.get("word", False),
+            ignore_case=not entry.get("case_sensitive", False),
+            channels=entry.get("channels"),
+            delete=entry.get("delete", True),
+        )
+
+    def source(self):
+        body = self.pattern if self.regex else re.escape(self.pattern)
+        if self.word:
+            body = rf"(?<!\w)(?:{body})(?!\w)"
+        return f"(?i:{body})" if self.ignore_case else f"(?:{body})"
+
+
+def load_triggers(settings):
+    """Triggers from ``TRIGGERS`` plus the old single ``trigger_word``/``TRIGGER_MESSAGE`` pair."""
+    triggers = []
+    if settings.get("trigger_word"):
+        triggers.append(Trigger(settings["trigger_word"], settings.get("TRIGGER_MESSAGE", "")))
+    for entry in settings.get("TRIGGERS", []):
+        try:
+            triggers.append(Trigger.from_config(entry))
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[triggers] Skipping invalid trigger {entry!r}: {e}")
+    return triggers
+
+
+class TriggerMatcher:
+    """All triggers compiled into one alternation, so a message is scanned once.
+
+    Every trigger becomes a named group ``t<index>``; ``match.lastgroup`` tells
+    which one hit. Regex triggers with capturing groups are skipped: their
+    names would clash and numbered backreferences would point at the wrong
+    group once combined (``(?:...)`` works). Channels named by a scoped
+    trigger get a combined pattern of their own, compiled once per distinct
+    set of triggers; every other channel uses the global pattern.
+    """
+
+    def __init__(self, triggers):
+        self.triggers = []
+        for trigger in triggers:
+            try:
+                groups = re.compile(trigger.source()).groups
+            except re.error as e:
+                print(f"[triggers] Skipping trigger {trigger.pattern!r}: {e}")
+                continue
+            if groups:
+                print(f"[triggers] Skipping trigger {trigger.pattern!r}: capturing groups are not supported, use (?:...)")
+                continue
+            self.triggers.append(trigger)
+        self._global = self._compile([i for i, t in enumerate(self.triggers) if t.channels is None])
+        self._per_channel = {}  # channel id -> pattern, only for channels a trigger is scoped to
+        patterns = {}           # trigger indexes -> pattern, shared by channels with the same scope
+        for channel_id in {c for t in self.triggers if t.channels for c in t.channels}:
+            indexes = tuple(i for i, t in enumerate(self.triggers) if t.channels is None or channel_id in t.channels)
+            if indexes not in patterns:
+                patterns[indexes] = self._compile(indexes)
+            self._per_channel[channel_id] = patterns[indexes]
+
+    def __len__(self):
+        return len(self.triggers)
+
+    def _compile(self, indexes):
+        if not indexes:
+            return None
+        return re.compile("|".join(f"(?P<t{i}>{self.triggers[i].source()})" for i in indexes))
+
+    def match(self, channel_id, text):
+        """Return the trigger matching earliest in ``text``, or None."""
+        pattern = self._per_channel.get(channel_id, self._global)
+        if pattern is None:
+            return None
+        found = pattern.search(text)
+        return self.triggers[int(found.lastgroup[1:])] if found else None